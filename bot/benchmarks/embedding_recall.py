@@ -0,0 +1,87 @@
+# bot/benchmarks/embedding_recall.py
+"""
+Recall of the compact embedding formats against float32.
+
+For every query, the top-k chunks found over float16 and int8 rows
+(services/embedding_codec.py) are compared with the exact float32 top-k.
+The fixture corpus is a fixed-seed set of project-management sentences,
+embedded with EMBEDDING_MODEL when sentence-transformers is installed, or
+(--synthetic) clustered random unit vectors of the same size.
+
+    cd bot && python -m benchmarks.embedding_recall [--synthetic] [--chunks N] [--queries N] [-k K]
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from services import embedding_codec
+from services.vector_index import normalize_rows, top_k
+
+SUBJECTS = ["login page", "billing service", "release pipeline", "mobile app", "search API", "onboarding flow",
+            "database backup", "invoice export", "admin dashboard", "notification emails", "user profile", "reporting job"]
+ACTIONS = ["fix a crash in", "add tests for", "refactor", "document", "speed up", "review the design of",
+           "migrate", "deploy", "monitor", "localize", "secure", "redesign"]
+DETAILS = ["before the Friday release", "after the customer escalation", "for the Q3 roadmap", "behind a feature flag",
+           "with the platform team", "once the vendor replies", "as agreed in the standup", "for the security audit"]
+
+
+def fixture_corpus(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [f"{rng.choice(ACTIONS).capitalize()} the {rng.choice(SUBJECTS)} {rng.choice(DETAILS)}." for _ in range(n)]
+
+
+def synthetic_embeddings(n: int, dim: int = 384, clusters: int = 48, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return normalize_rows(centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)))
+
+
+def recall(rows: np.ndarray, kind: str, exact: list, queries: np.ndarray, k: int) -> float:
+    found = 0
+    for query, truth in zip(queries, exact):
+        found += len(truth & {hit.row for hit in top_k(rows, query, k, kind)})
+    return found / (k * len(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--synthetic", action="store_true", help="use clustered random vectors instead of a model")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_embeddings(args.chunks + args.queries)
+    else:
+        from services.embedding_service import embedding_service
+
+        vectors = normalize_rows(embedding_service.encode_sync(fixture_corpus(args.chunks + args.queries)))
+    corpus, queries = vectors[:args.chunks], vectors[args.chunks:]
+    exact = [{hit.row for hit in top_k(corpus, query, args.k)} for query in queries]
+
+    results = {}
+    for kind in embedding_codec.KINDS:
+        rows = embedding_codec.quantize(corpus, kind)
+        started = time.perf_counter()
+        value = recall(rows, kind, exact, queries, args.k)
+        results[kind] = {
+            "bytes_per_vector": embedding_codec.row_dtype(kind, corpus.shape[1]).itemsize,
+            f"recall@{args.k}": round(value, 4),
+            "avg_query_ms": round(1000 * (time.perf_counter() - started) / len(queries), 3),
+        }
+    print(json.dumps({
+        "chunks": args.chunks,
+        "queries": args.queries,
+        "dim": corpus.shape[1],
+        "json_bytes_per_vector": len(json.dumps(corpus[0].tolist())),
+        "halfvec_literal_bytes_per_vector": len(embedding_codec.vector_literal(corpus[0])),
+        "formats": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
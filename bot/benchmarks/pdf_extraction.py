@@ -0,0 +1,93 @@
+# bot/benchmarks/pdf_extraction.py
+"""
+Serial vs. process-pool PDF text extraction (utils/file_utils.py).
+
+Fixture PDFs of several sizes are generated in a temporary directory
+(plain text pages, fixed seed), then each is read page by page both ways.
+The pool runs PDF_EXTRACT_WORKERS processes; the speedup is bounded by
+the number of cores.
+
+    cd bot && python -m benchmarks.pdf_extraction [--pages 10 100 300] [--workers N]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from utils import file_utils
+
+WORDS = ["deadline", "budget", "milestone", "vendor", "sprint", "invoice", "release", "scope",
+         "stakeholder", "estimate", "risk", "backlog", "contract", "review", "handover", "audit"]
+
+
+def write_fixture_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 7) -> None:
+    """A minimal PDF with `pages` pages of Helvetica text."""
+    rng = random.Random(seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def timed_read(path: str) -> tuple:
+    started = time.perf_counter()
+    pages = list(file_utils.iter_text_from_file(path))
+    return time.perf_counter() - started, pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"fixture_{pages}.pdf")
+            write_fixture_pdf(path, pages)
+
+            file_utils.PDF_EXTRACT_WORKERS = 0
+            serial_s, serial_pages = timed_read(path)
+
+            file_utils.PDF_EXTRACT_WORKERS = args.workers
+            file_utils.PDF_PARALLEL_MIN_PAGES = 0
+            if args.workers > 0:
+                # Start the worker processes first so their start-up is not timed.
+                for future in [file_utils._get_pdf_pool().submit(int) for _ in range(args.workers)]:
+                    future.result()
+            parallel_s, parallel_pages = timed_read(path)
+
+            results.append({
+                "pages": pages,
+                "bytes": os.path.getsize(path),
+                "serial_s": round(serial_s, 3),
+                "parallel_s": round(parallel_s, 3),
+                "speedup": round(serial_s / parallel_s, 2) if parallel_s else None,
+                "same_text": serial_pages == parallel_pages,
+            })
+    file_utils.shutdown_pdf_pool()
+    print(json.dumps({"workers": args.workers, "cores": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,7 @@ The JSON object MUST have two keys: "action" and "params".
 3.  **Date Handling**: The current date is **{current_date}**. All extracted dates must be resolved to the `YYYY-MM-DD` format.
 
 4.  **Parameter Schemas**:
-    - For 'create_task': `params` can include `name`, `description`, `project_name`, `assignee`, `deadline`.
+    - For 'create_task': `params` can include `name`, `description`, `project_name`, `assignee`, `deadline`. If the user asks for several tasks at once, put them in `tasks` instead: a list of objects with the same keys.
     - For 'create_project': `params` must include `name`. `description` and `raw_input` are optional.
     - For 'assign_task': `params` must include `task_name`, `assignee`.
     - For 'delete_task': `params` must include `task_id`.
@@ -40,6 +40,11 @@ User Request: "Create a task 'Fix Bug' in project 'Test' for @Apoorav Malik due
 Your JSON Output:
 {{"action": "create_task", "params": {{"name": "Fix Bug", "description": null, "project_name": "Test", "assignee": "@Apoorav Malik", "deadline": "2025-07-20"}}}}
 ---
+**Example 2b: Create Several Tasks**
+User Request: "create tasks 'Design schema' and 'Write API docs' in project 'Backend', both due Friday"
+Your JSON Output:
+{{"action": "create_task", "params": {{"tasks": [{{"name": "Design schema", "description": null, "project_name": "Backend", "assignee": null, "deadline": "2025-07-25"}}, {{"name": "Write API docs", "description": null, "project_name": "Backend", "assignee": null, "deadline": "2025-07-25"}}]}}}}
+---
 **Example 3: Assign Task (With Context)**
 User Request: "assign this to @jane"
 Context Task ID: `a1b2-c3d4`
@@ -1,8 +1,7 @@
 from graph.state import AgentState
-from utils.supabaseClient import supabase
-from services.task_service import _create_task_service, _assign_task_service
+from services.task_service import _create_task_service, _create_tasks_service, _assign_task_service
 from services.project_service import _create_project_service, _project_details_service, _answer_project_question_service
-from services.report_service import _summary_service
+from services.report_service import _summary_service, _group_summary_service
 
 async def create_task_tool(state: AgentState) -> dict:
     """
@@ -10,6 +9,24 @@ async def create_task_tool(state: AgentState) -> dict:
     """
     print("--- 🛠️ Running Create Task Tool ---")
     params = state.get("params", {})
+
+    # Several tasks in one request are created with a single batched insert
+    if params.get("tasks"):
+        tasks = [
+            {
+                "title": task.get("name"),
+                "description": task.get("description"),
+                "project_name": task.get("project_name"),
+                "deadline": task.get("deadline"),
+            }
+            for task in params["tasks"] if isinstance(task, dict)
+        ]
+        success, message = await _create_tasks_service(
+            telegram_user_id=state.get("telegram_user_id"),
+            group_id=state.get("chat_id"),
+            tasks=tasks
+        )
+        return {"response": message}
     
     # 1. Validation: Check for the required task name
     task_name = params.get("name")
@@ -18,7 +35,7 @@ async def create_task_tool(state: AgentState) -> dict:
         return {"response": response}
 
     # 2. Call the shared service function with data from the agent's state
-    success, message = _create_task_service(
+    success, message = await _create_task_service(
         telegram_user_id=state.get("telegram_user_id"),
         group_id=state.get("chat_id"),
         title=task_name,
@@ -53,7 +70,7 @@ async def assign_task_tool(state: AgentState) -> dict:
 
     # 3. Call the shared service function
     # Note: We will need to update _assign_task_service to accept task_id
-    success, message = _assign_task_service(
+    success, message = await _assign_task_service(
         admin_telegram_user_id=state.get("telegram_user_id"),
         group_id=state.get("chat_id"),
         assignee_username=assignee,
@@ -76,7 +93,7 @@ async def create_project_tool(state: AgentState) -> dict:
         return {"response": response}
 
     # 2. Call the shared service function with data from the agent's state
-    success, message = _create_project_service(
+    success, message = await _create_project_service(
         telegram_user_id=state.get("telegram_user_id"),
         group_id=state.get("chat_id"),
         name=project_name,
@@ -101,7 +118,7 @@ async def project_details_tool(state: AgentState) -> dict:
         return {"response": response}
 
     # 2. Call the shared service function with data from the agent's state
-    success, message = _project_details_service(
+    success, message = await _project_details_service(
         telegram_user_id=state.get("telegram_user_id"),
         group_id=state.get("chat_id"),
         project_name=project_name,
@@ -142,23 +159,17 @@ async def summary_tool(state: AgentState) -> dict:
 
         print(f" tools.py ----- Generating summary for project '{project_name}' in group {state.get('chat_id')} for the last {days} days")
         if not project_name or project_name.lower() == "all projects":
-            # Get all projects
-            projects_res = supabase.from_("projects").select("name").eq("group_id", state.get("chat_id")).execute()
-            if not projects_res.data:
+            # Summarize every project from a single pass over the group's tasks
+            success, messages = await _group_summary_service(
+                telegram_user_id=state.get("telegram_user_id"),
+                group_id=state.get("chat_id"),
+                days=days
+            )
+            if success and not messages:
                 return {"response": "No projects found to summarize."}
-            
-            messages = []
-            for project in projects_res.data:
-                success, message = _summary_service(
-                    telegram_user_id=state.get("telegram_user_id"),
-                    group_id=state.get("chat_id"),
-                    project_name=project['name'],
-                    days=days
-                )
-                messages.append(message)
             return {"response": "\n\n---\n\n".join(messages)}
         else:
-            success, message = _summary_service(
+            success, message = await _summary_service(
                 telegram_user_id=state.get("telegram_user_id"),
                 group_id=state.get("chat_id"),
                 project_name=project_name,
@@ -1,9 +1,11 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from utils.supabaseClient import supabase
+from utils.db import get_db
+from utils.auth_helper import invalidate_group
 
 async def group_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
+        db = await get_db()
         # For ChatMemberHandler, we need to access my_chat_member, not chat_member
         chat_member_update = update.my_chat_member
         
@@ -43,19 +45,20 @@ async def group_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"👥 Bot added to group: {group_name} ({group_id})")
 
         # Check if group already exists
-        existing = supabase.from_("groups").select("group_id").eq("group_id", group_id).execute()
+        existing = await db.from_("groups").select("group_id").eq("group_id", group_id).execute()
 
         if existing.data and len(existing.data) > 0:
             print("ℹ️ Group already registered.")
             return  # Already exists
 
         # Insert new group
-        result = supabase.from_("groups").insert({
+        result = await db.from_("groups").insert({
             "group_id": group_id,
             "group_name": group_name
         }).execute()
 
         if result.data:
+            invalidate_group(group_id)
             print(f"✅ Group {group_name} ({group_id}) registered in DB.")
         else:
             print(f"❌ Failed to register group in DB: {result}")
@@ -1,13 +1,12 @@
 from telegram import Update, Document, InputFile
 from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
 from datetime import datetime
-from utils.supabaseClient import supabase
-from utils.auth_helper import get_user_from_telegram, check_admin_permission
-import os
-from uuid import uuid4
-import tempfile
-from services.project_service import _create_project_service, _project_details_service, _project_files_service, _get_files_service, _embed_and_store_file_content
-from utils.file_utils import read_text_from_file
+from utils.db import get_db
+from utils.dispatcher import dispatcher
+from utils.user_directory import resolve_usernames
+from services.project_service import _create_project_service, _project_details_service, _project_files_service, _get_files_service, _delete_project_service
+from services.ingestion_queue import ingestion_queue
 import json
 
 async def create_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -34,7 +33,9 @@ async def create_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # 3. Call the shared service function
-    success, message = _create_project_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _create_project_service,
         telegram_user_id=update.effective_user.id,
         group_id=update.effective_chat.id,
         name=name,
@@ -47,58 +48,37 @@ async def create_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def delete_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Delete a project by its ID along with its tasks.
+    Delete a project by its ID along with its tasks, their history,
+    its file records and its stored files.
     Usage: /delete_project | <project_id>
     """
-    try:
-        user_data = get_user_from_telegram(update.effective_user.id)
-        if not user_data:
-            await update.message.reply_text("❌ Please link your Telegram account first using /link")
-            return
-
-        if not context.args:
-            await update.message.reply_text(
-                "❗ Usage: `/delete_project | <project_id>`",
-                parse_mode="Markdown"
-            )
-            return
-
-        full_text = " ".join(context.args)
-        parts = [p.strip() for p in full_text.split("|")]
-        project_id = parts[0] if parts else None
-
-        if not project_id:
-            await update.message.reply_text("❗ Please provide a valid project ID.")
-            return
-
-        group_id = update.message.chat.id if update.message.chat.type in ["group", "supergroup"] else None
-
-        query = supabase.from_("projects").select("*").eq("id", project_id)
-        if group_id:
-            query = query.eq("group_id", group_id)
-
-        project_result = query.execute()
-
-        if not project_result.data:
-            await update.message.reply_text("❌ No project found with that ID.")
-            return
+    if not context.args:
+        await update.message.reply_text(
+            "❗ Usage: `/delete_project | <project_id>`",
+            parse_mode="Markdown"
+        )
+        return
 
-        project = project_result.data[0]
+    if update.message.chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❗ This command must be used inside a group.")
+        return
 
-        supabase.from_("tasks").delete().eq("project_id", project_id).execute()
-        delete_result = supabase.from_("projects").delete().eq("id", project_id).execute()
+    full_text = " ".join(context.args)
+    parts = [p.strip() for p in full_text.split("|") if p.strip()]
+    project_id = parts[0] if parts else None
 
-        if delete_result.data:
-            await update.message.reply_text(
-                f"🗑️ Project **{project['name']}** and its tasks deleted successfully.",
-                parse_mode="Markdown"
-            )
-        else:
-            await update.message.reply_text("❌ Failed to delete the project.")
+    if not project_id:
+        await update.message.reply_text("❗ Please provide a valid project ID.")
+        return
 
-    except Exception as e:
-        print(f"Error in delete_project: {e}")
-        await update.message.reply_text("❗ Something went wrong while deleting the project.")
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _delete_project_service,
+        telegram_user_id=update.effective_user.id,
+        project_id=project_id,
+        group_id=update.message.chat.id
+    )
+    await update.message.reply_text(message, parse_mode="Markdown")
 
 
 async def project_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -120,7 +100,9 @@ async def project_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
     project_name = " ".join(context.args)
 
     # 3. Call the shared service function
-    success, message = _project_details_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _project_details_service,
         telegram_user_id=update.effective_user.id,
         group_id=update.effective_chat.id,
         project_name=project_name
@@ -146,7 +128,9 @@ async def project_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
     project_name = " ".join(context.args)
 
     # 2. Call the service function to get project details
-    success, result_data = _project_files_service(
+    success, result_data = await dispatcher.run(
+        update.effective_chat.id,
+        _project_files_service,
         telegram_user_id=update.effective_user.id,
         group_id=update.effective_chat.id,
         project_name=project_name
@@ -168,7 +152,8 @@ async def project_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles file uploads, extracts text using file_utils, and triggers embedding.
+    Handles file uploads: acknowledges the file straight away and queues it
+    for storage, text extraction and embedding in the background.
     """
     try:
         user_id = update.effective_user.id
@@ -181,51 +166,18 @@ async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_T
             await update.message.reply_text("❗ Please send a valid document.")
             return
 
-        project_id = file_data["project_id"]
-        uploaded_by = file_data["user_id"]
-        file_name = file.file_name
-        file_unique_name = f"{project_id}_{uuid4()}_{file_name}"
-
-        # Download file to a temporary path
-        telegram_file = await context.bot.get_file(file.file_id)
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, file_unique_name)
-        await telegram_file.download_to_drive(temp_path)
-
-        # Use the file utility to read content based on file type
-        file_content = read_text_from_file(temp_path)
-
-        if not file_content:
-            await update.message.reply_text(f"⚠️ Could not extract text from *{file_name}*. The file might be empty, corrupted, or an unsupported format.", parse_mode="Markdown")
-        else:
-            # If content was extracted, call the service to generate and store embeddings
-            embedding_success = _embed_and_store_file_content(project_id, file_content)
-            if not embedding_success:
-                 await update.message.reply_text(f"⚠️ Failed to create embeddings for *{file_name}*.", parse_mode="Markdown")
-
-        # Upload the original file to Supabase Storage
-        with open(temp_path, "rb") as f:
-            supabase.storage.from_("project-file-storage").upload(
-                path=f"project-files/{file_unique_name}",
-                file=f,
-                file_options={"content-type": file.mime_type, "upsert": "true"}
-            )
-
-        # Insert metadata into the database
-        supabase.from_("project_files").insert({
-            "id": str(uuid4()),
-            "project_id": project_id,
-            "filename": file_name,
-            "custom_name": file_unique_name,
-            "type": os.path.splitext(file_name)[1].lower(),
-            "uploaded_by": uploaded_by
-        }).execute()
-
+        # The background job edits this message as each stage finishes
+        progress = await update.message.reply_text(f"📥 Received *{escape_markdown(file.file_name)}*. Processing it in the background...", parse_mode="Markdown")
+        await ingestion_queue.enqueue(
+            project_id=file_data["project_id"],
+            chat_id=progress.chat_id,
+            message_id=progress.message_id,
+            telegram_file_id=file.file_id,
+            file_name=file.file_name,
+            mime_type=file.mime_type,
+            uploaded_by=file_data["user_id"],
+        )
         del AWAITING_FILE_UPLOAD[user_id]
-        await update.message.reply_text(f"✅ File *{file_name}* uploaded and linked to the project!", parse_mode="Markdown")
-
-        # Clean up the temporary file
-        os.remove(temp_path)
 
     except Exception as e:
         print(f"Error in handle_document_upload: {e}")
@@ -244,7 +196,9 @@ async def get_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
     project_name = " ".join(context.args)
 
     # Call the service to get the list of file information
-    success, files_info, actual_project_name = _get_files_service(
+    success, files_info, actual_project_name = await dispatcher.run(
+        update.effective_chat.id,
+        _get_files_service,
         telegram_user_id=update.effective_user.id,
         group_id=update.effective_chat.id,
         project_name=project_name
@@ -262,20 +216,16 @@ async def get_files(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(f"📂 Sending {len(files_info)} file(s) for project **{actual_project_name}**...", parse_mode="Markdown")
 
+    db = await get_db()
+    uploaders = await resolve_usernames(file_data.get("uploaded_by") for file_data in files_info)
     for file_data in files_info:
         try:
             storage_path = f"project-files/{file_data['custom_name']}"
             
             # Download file from Supabase storage
-            file_bytes = supabase.storage.from_("project-file-storage").download(storage_path)
-
-            # Manually fetch the uploader's username
-            uploader = "an unknown user"
-            uploader_id = file_data.get("uploaded_by")
-            if uploader_id:
-                user_res = supabase.from_("telegram_users").select("telegram_username").eq("id", uploader_id).single().execute()
-                if user_res.data and user_res.data.get("telegram_username"):
-                    uploader = user_res.data["telegram_username"]
+            file_bytes = await db.storage.from_("project-file-storage").download(storage_path)
+
+            uploader = uploaders.get(file_data.get("uploaded_by")) or "an unknown user"
 
             # Send the document directly from memory
             await update.message.reply_document(
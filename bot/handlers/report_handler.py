@@ -1,8 +1,8 @@
 # bot/handlers/report_handler.py
 from telegram import Update
 from telegram.ext import ContextTypes
-from services.report_service import _summary_service
-from utils.supabaseClient import supabase
+from services.report_service import _summary_service, _group_summary_service
+from utils.dispatcher import dispatcher
 
 async def summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -22,23 +22,23 @@ async def summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
         days = 7
         print(f"Generating summary for all projects in group {group_id} for the last {days} days")
 
-        # Fetch all projects for the current group
-        projects_res = supabase.from_("projects").select("name").eq("group_id", group_id).execute()
-        if not projects_res.data:
+        # All projects are summarized from a single pass over the group's tasks
+        success, messages = await dispatcher.run(
+            update.effective_chat.id,
+            _group_summary_service,
+            telegram_user_id=telegram_user_id,
+            group_id=group_id,
+            days=days
+        )
+        if success and not messages:
             await update.message.reply_text("No projects found in this group to summarize.")
             return
 
-        await update.message.reply_text(f"📊 Generating summaries for {len(projects_res.data)} project(s)...")
+        if success:
+            await update.message.reply_text(f"📊 Summaries for {len(messages)} project(s):")
 
-        # Loop through each project and send a separate summary
-        for project in projects_res.data:
-            project_name = project['name']
-            success, message = _summary_service(
-                telegram_user_id=telegram_user_id,
-                group_id=group_id,
-                project_name=project_name,
-                days=days
-            )
+        # Send a separate message per project
+        for message in messages:
             await update.message.reply_text(message, parse_mode="Markdown")
 
     else:
@@ -60,7 +60,9 @@ async def summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         print(f"Generating summary for project '{project_name}' in group {group_id} for the last {days} days")
-        success, message = _summary_service(
+        success, message = await dispatcher.run(
+            update.effective_chat.id,
+            _summary_service,
             telegram_user_id=telegram_user_id,
             group_id=group_id,
             project_name=project_name,
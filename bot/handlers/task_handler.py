@@ -1,10 +1,26 @@
-from telegram import Update
+import re
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from datetime import datetime, timezone
-from utils.supabaseClient import supabase
+from utils.db import get_db
+from utils.dispatcher import dispatcher
+from services.task_index import forget_task
 from utils.auth_helper import get_user_from_telegram, check_admin_permission
-from typing import Tuple
-from services.task_service import _create_task_service, _assign_task_service, _working_task_service, _completed_task_service, _list_tasks_service, _task_history_service, _task_details_service
+from typing import Tuple, List
+from services.task_service import _create_task_service, _create_tasks_service, _assign_task_service, _bulk_assign_service, _bulk_status_service, _working_task_service, _completed_task_service, _list_tasks_service, _task_history_service, _task_details_service
+
+# Task IDs are UUIDs; bulk commands pick them out of the command text or the replied-to message.
+TASK_ID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+def _task_ids_in(text: str) -> List[str]:
+    return TASK_ID_PATTERN.findall(text or "")
+
+
+def _command_body(update: Update) -> str:
+    """The message text after the command, keeping line breaks."""
+    command_and_body = update.message.text.split(maxsplit=1)
+    return command_and_body[1] if len(command_and_body) > 1 else ""
 
 async def create_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -35,7 +51,9 @@ async def create_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # 3. Call the shared service function with the parsed data
-    success, message = _create_task_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _create_task_service,
         telegram_user_id=update.effective_user.id,
         group_id=update.message.chat.id,
         title=title,
@@ -47,6 +65,49 @@ async def create_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # 4. Reply to the user with the result from the service
     await update.message.reply_text(message, parse_mode="Markdown")
 
+async def create_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Command handler for /create_tasks.
+    Each line after the command is one task in the /create_task format:
+    <title> | <description> | <project name> | <deadline>
+    """
+    # 1. Perform Telegram-specific checks
+    if update.message.chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❌ This command can only be used in groups.")
+        return
+
+    # 2. Parse one task per line (context.args would lose the line breaks)
+    tasks = []
+    for line in _command_body(update).splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if not parts[0]:
+            continue
+        tasks.append({
+            "title": parts[0],
+            "description": parts[1] if len(parts) > 1 and parts[1] else None,
+            "project_name": parts[2] if len(parts) > 2 and parts[2] else None,
+            "deadline": parts[3] if len(parts) > 3 and parts[3] else None,
+        })
+
+    if not tasks:
+        await update.message.reply_text(
+            "❗ Usage: one task per line\n`/create_tasks <title> | <description> | <project name> | <deadline>`\n`<title> | ...`",
+            parse_mode="Markdown"
+        )
+        return
+
+    # 3. Call the shared service function with every parsed task
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _create_tasks_service,
+        telegram_user_id=update.effective_user.id,
+        group_id=update.message.chat.id,
+        tasks=tasks
+    )
+
+    # 4. Reply to the user with the result from the service
+    await update.message.reply_text(message, parse_mode="Markdown")
+
 async def assign_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Command handler for /assign.
@@ -81,7 +142,9 @@ async def assign_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # 4. Call the shared service function with the parsed data
-    success, message = _assign_task_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _assign_task_service,
         admin_telegram_user_id=update.effective_user.id,
         group_id=update.message.chat.id,
         assignee_username=assignee_username,
@@ -92,6 +155,81 @@ async def assign_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, parse_mode="Markdown")
     
             
+async def assign_many(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Command handler for /assign_many.
+    One line per assignee: `@username | <task_id> <task_id> ...`. When replying
+    to a message (e.g. the /create_tasks reply), `@username` alone assigns
+    every task ID found in that message.
+    """
+    if update.message.chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❌ This command can only be used in groups.")
+        return
+
+    replied = update.message.reply_to_message
+    replied_ids = _task_ids_in(replied.text) if replied and replied.text else []
+
+    assignments = {}
+    for line in _command_body(update).splitlines():
+        username, _, ids_text = (part.strip() for part in line.partition("|"))
+        if not username.startswith("@"):
+            continue
+        task_ids = _task_ids_in(ids_text) or replied_ids
+        assignments.setdefault(username, []).extend(task_ids)
+
+    if not assignments or not any(assignments.values()):
+        await update.message.reply_text(
+            "❗ Usage: `/assign_many @username | <task_id> <task_id> ...` (one line per user),\n"
+            "or reply to a message listing task IDs with `/assign_many @username`.",
+            parse_mode="Markdown"
+        )
+        return
+
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _bulk_assign_service,
+        admin_telegram_user_id=update.effective_user.id,
+        group_id=update.message.chat.id,
+        assignments=assignments
+    )
+    await update.message.reply_text(message, parse_mode="Markdown")
+
+
+async def set_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Command handler for /set_status.
+    Usage: `/set_status <status> | <task_id> <task_id> ...`, or reply to a
+    message listing task IDs with `/set_status <status>`.
+    """
+    if update.message.chat.type not in ["group", "supergroup"]:
+        await update.message.reply_text("❌ This command can only be used in groups.")
+        return
+
+    status, _, ids_text = (part.strip() for part in _command_body(update).partition("|"))
+    task_ids = _task_ids_in(ids_text)
+    replied = update.message.reply_to_message
+    if not task_ids and replied and replied.text:
+        task_ids = _task_ids_in(replied.text)
+
+    if not status or not task_ids:
+        await update.message.reply_text(
+            "❗ Usage: `/set_status <status> | <task_id> <task_id> ...`,\n"
+            "or reply to a message listing task IDs with `/set_status <status>`.",
+            parse_mode="Markdown"
+        )
+        return
+
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _bulk_status_service,
+        admin_telegram_user_id=update.effective_user.id,
+        group_id=update.message.chat.id,
+        status=status,
+        task_ids=task_ids
+    )
+    await update.message.reply_text(message, parse_mode="Markdown")
+
+
 async def working_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Command handler for /working. Parses the task name and calls the service.
@@ -104,7 +242,9 @@ async def working_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     group_id = update.message.chat.id if update.message.chat.type in ["group", "supergroup"] else None
 
     # Call the shared service function
-    success, message = _working_task_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _working_task_service,
         telegram_user_id=update.effective_user.id,
         task_name=task_name,
         group_id=group_id
@@ -125,7 +265,9 @@ async def completed_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     group_id = update.message.chat.id if update.message.chat.type in ["group", "supergroup"] else None
 
     # Call the shared service function
-    success, message = _completed_task_service(
+    success, message = await dispatcher.run(
+        update.effective_chat.id,
+        _completed_task_service,
         telegram_user_id=update.effective_user.id,
         task_name=task_name,
         group_id=group_id
@@ -134,20 +276,43 @@ async def completed_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Reply with the result from the service
     await update.message.reply_text(message, parse_mode="Markdown")
 
+def _more_button(kind: str, requester_id: int, cursor: str) -> InlineKeyboardMarkup:
+    """
+    A single "More" button for the page after `cursor`, usable only by the user
+    who asked for the list ("<kind>|<requester id in base 36>|<cursor>").
+    callback_data must stay within Telegram's 64 bytes.
+    """
+    callback_data = f"{kind}|{_base36(requester_id)}|{cursor}"
+    return InlineKeyboardMarkup([[InlineKeyboardButton("More ▶", callback_data=callback_data)]])
+
+
+def _base36(number: int) -> str:
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"[digit] + digits
+        if not number:
+            return digits
+
+
 async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Command handler for /tasks. Calls the list_tasks service.
+    Command handler for /tasks. Calls the list_tasks service and
+    adds a "More" button when there are further pages.
     """
     group_id = update.message.chat.id if update.message.chat.type in ["group", "supergroup"] else None
 
     # Call the shared service function
-    success, message = _list_tasks_service(
+    success, message, cursor = await dispatcher.run(
+        update.effective_chat.id,
+        _list_tasks_service,
         telegram_user_id=update.effective_user.id,
         group_id=group_id
     )
     
     # Reply with the result from the service
-    await update.message.reply_text(message, parse_mode="Markdown")
+    reply_markup = _more_button("t", update.effective_user.id, cursor) if cursor else None
+    await update.message.reply_text(message, parse_mode="Markdown", reply_markup=reply_markup)
     
 async def task_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -161,24 +326,62 @@ async def task_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     group_id = update.message.chat.id if update.message.chat.type in ["group", "supergroup"] else None
 
     # Call the shared service function
-    success, message = _task_history_service(
+    success, message, cursor = await dispatcher.run(
+        update.effective_chat.id,
+        _task_history_service,
         telegram_user_id=update.effective_user.id,
         task_name=task_name,
         group_id=group_id
     )
     
     # Reply with the result from the service
-    await update.message.reply_text(message, parse_mode="Markdown")
+    reply_markup = _more_button("h", update.effective_user.id, cursor) if cursor else None
+    await update.message.reply_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+
+
+async def task_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Callback handler for the "More" buttons of /tasks ("t|<requester>|<cursor>")
+    and /history ("h|<requester>|<task_id>|<cursor>"). Sends the next page as a
+    new message. Only the user who asked for the list may page through it.
+    """
+    query = update.callback_query
+    kind, requester, page = (query.data.split("|", 2) + ["", ""])[:3]
+    services = {"t": _list_tasks_service, "h": _task_history_service}
+    if kind not in services or not page:
+        # Buttons sent before requesters were recorded.
+        await query.answer("This button has expired. Please run the command again.", show_alert=True)
+        return
+    if requester != _base36(query.from_user.id):
+        await query.answer("Only the person who asked for this list can see more of it.", show_alert=True)
+        return
+    await query.answer()
+
+    chat = query.message.chat
+    group_id = chat.id if chat.type in ["group", "supergroup"] else None
+    success, message, cursor = await dispatcher.run(
+        chat.id,
+        services[kind],
+        telegram_user_id=query.from_user.id,
+        group_id=group_id,
+        cursor=page
+    )
+
+    # The button has been used; drop it from the previous page.
+    await query.edit_message_reply_markup(reply_markup=None)
+    reply_markup = _more_button(kind, query.from_user.id, cursor) if cursor else None
+    await query.message.reply_text(message, parse_mode="Markdown", reply_markup=reply_markup)
         
         
 async def delete_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
+        db = await get_db()
         if not context.args:
             await update.message.reply_text("❗ Usage: /delete_task <task_id>")
             return
 
         task_id = context.args[0]
-        user_data = get_user_from_telegram(update.effective_user.id)
+        user_data = await get_user_from_telegram(update.effective_user.id)
         if not user_data:
             await update.message.reply_text("❌ Please link your Telegram account first using /link")
             return
@@ -186,8 +389,8 @@ async def delete_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
         group_id = update.message.chat.id
 
         # Fetch the task to confirm it exists
-        task_res = (
-            supabase
+        task_res = await (
+            db
             .from_("tasks")
             .select("*")
             .eq("id", task_id)
@@ -202,10 +405,11 @@ async def delete_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Delete all status_logs referencing this task
-        supabase.from_("status_logs").delete().eq("task_id", task_id).execute()
+        await db.from_("status_logs").delete().eq("task_id", task_id).execute()
 
         # Delete the task
-        supabase.from_("tasks").delete().eq("id", task_id).execute()
+        await db.from_("tasks").delete().eq("id", task_id).execute()
+        forget_task(group_id, task_id)
 
         await update.message.reply_text(f"🗑️ Task *{task['title']}* (ID: `{task_id}`) deleted successfully.", parse_mode="Markdown")
 
@@ -226,7 +430,9 @@ async def task_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
     group_id = update.message.chat.id
 
     # Call the shared service function
-    success, messages = _task_details_service(
+    success, messages = await dispatcher.run(
+        update.effective_chat.id,
+        _task_details_service,
         task_name=task_name,
         group_id=group_id
     )
@@ -1,21 +1,25 @@
 import os
 import asyncio
 import threading
-from flask import Flask
+from flask import Flask, jsonify
 from waitress import serve
 from dotenv import load_dotenv
 from telegram import Update, ChatMemberUpdated
-from telegram.ext import Application, MessageHandler, CommandHandler, ChatMemberHandler, ContextTypes, filters
+from telegram.ext import Application, MessageHandler, CommandHandler, CallbackQueryHandler, ChatMemberHandler, ContextTypes, filters
 import re
 from handlers.link_handler import link
 from handlers.group_handler import group_handler
 from handlers.task_handler import (
     create_task,
+    create_tasks,
     assign_task,
+    assign_many,
+    set_status,
     working_task,
     completed_task,
     list_tasks,
     task_history,
+    task_page_callback,
     delete_task_by_id,
     task_details
 )
@@ -29,28 +33,76 @@ from handlers.project_handler import (
 )
 from handlers.ai_handler import route_to_ai
 from handlers.report_handler import summary
+from utils.db import close_db
+from utils.dispatcher import dispatcher, DispatcherBusyError
+from utils.auth_helper import auth_cache_stats
+from utils.user_directory import user_directory_stats
+from utils.file_utils import shutdown_pdf_pool
+from services.task_index import task_index_stats
+from services.project_catalog import project_catalog_stats
+from services.embedding_service import embedding_service
+from services.vector_index import vector_index_stats
+from services.embedding_cache import embedding_cache_stats
+from services.ingestion_queue import ingestion_queue
+from services.answer_cache import answer_cache_stats
 
 # Load environment variables
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 BOT_USERNAME = os.getenv("BOT_USERNAME")
 
-print(f"✅ Bot script started. Listening for mentions of: @{BOT_USERNAME}")
+# Nothing below runs on import: the spawn-based worker pools (embeddings, PDF
+# extraction) re-import this module in every worker process.
 
-# --- Create Flask App for Render Health Checks ---
-flask_app = Flask(__name__)
+# --- Flask App for Render Health Checks ---
+def create_flask_app() -> Flask:
+    flask_app = Flask(__name__)
 
-@flask_app.route('/')
-def index():
-    return "Bot is running!"
+    @flask_app.route('/')
+    def index():
+        return "Bot is running!"
+
+    @flask_app.route('/stats')
+    def stats():
+        return jsonify({
+            "dispatcher": dispatcher.stats(),
+            "auth_cache": auth_cache_stats(),
+            "user_directory": user_directory_stats(),
+            "task_index": task_index_stats(),
+            "project_catalog": project_catalog_stats(),
+            "embeddings": embedding_service.stats(),
+            "rag_index": vector_index_stats(),
+            "embedding_cache": embedding_cache_stats(),
+            "ingestion": ingestion_queue.stats(),
+            "answer_cache": answer_cache_stats(),
+        })
+
+    return flask_app
 
 def run_flask():
     port = int(os.environ.get('PORT', 8080))
     print(f"Starting Flask server on port {port}...")
-    serve(flask_app, host='0.0.0.0', port=port)
+    serve(create_flask_app(), host='0.0.0.0', port=port)
 
 # --- Telegram Bot Setup ---
-app = Application.builder().token(BOT_TOKEN).build()
+async def on_startup(application: Application):
+    # Load the embedding model in the background so the first RAG question doesn't pay for it.
+    embedding_service.start_warmup()
+    # Resume uploads that were still being processed when the bot stopped.
+    await ingestion_queue.start(application.bot)
+
+async def on_shutdown(application: Application):
+    await ingestion_queue.stop()
+    embedding_service.shutdown()
+    shutdown_pdf_pool()
+    await close_db()
+
+async def handle_error(update: object, context: "ContextTypes.DEFAULT_TYPE"):
+    if isinstance(context.error, DispatcherBusyError):
+        if isinstance(update, Update) and update.effective_message:
+            await update.effective_message.reply_text("⏳ The bot is busy right now. Please try again in a moment.")
+        return
+    print(f"Unhandled error while processing an update: {context.error}")
 
 async def handle_hello(update: Update, context: "ContextTypes.DEFAULT_TYPE"):
     message_text = update.message.text.lower()
@@ -66,30 +118,49 @@ async def handle_hello(update: Update, context: "ContextTypes.DEFAULT_TYPE"):
             parse_mode="Markdown"
         )
 
-# --- Register all your handlers ---
-ai_command_filter = filters.Regex(re.compile(r'^@' + re.escape(BOT_USERNAME), re.IGNORECASE))
-app.add_handler(MessageHandler(ai_command_filter, route_to_ai))
-app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_hello))
-app.add_handler(CommandHandler("link", link))
-app.add_handler(ChatMemberHandler(group_handler, ChatMemberHandler.MY_CHAT_MEMBER))
-app.add_handler(CommandHandler("create_task", create_task))
-app.add_handler(CommandHandler("assign", assign_task))
-app.add_handler(CommandHandler("working", working_task))
-app.add_handler(CommandHandler("completed", completed_task))
-app.add_handler(CommandHandler("tasks", list_tasks))
-app.add_handler(CommandHandler("history", task_history))
-app.add_handler(CommandHandler("delete_task", delete_task_by_id))
-app.add_handler(CommandHandler("task_details", task_details))
-app.add_handler(CommandHandler("summary", summary))
-app.add_handler(CommandHandler("create_project", create_project))
-app.add_handler(CommandHandler("delete_project", delete_project))
-app.add_handler(CommandHandler("project_details", project_details))
-app.add_handler(CommandHandler("project_files", project_files))
-app.add_handler(MessageHandler(filters.Document.ALL, handle_document_upload))
-app.add_handler(CommandHandler("get_files", get_files))
+def build_application() -> Application:
+    # Updates are processed concurrently; the dispatcher keeps each chat's commands in order.
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(True)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+
+    # --- Register all your handlers ---
+    ai_command_filter = filters.Regex(re.compile(r'^@' + re.escape(BOT_USERNAME), re.IGNORECASE))
+    app.add_handler(MessageHandler(ai_command_filter, route_to_ai))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_hello))
+    app.add_handler(CommandHandler("link", link))
+    app.add_handler(ChatMemberHandler(group_handler, ChatMemberHandler.MY_CHAT_MEMBER))
+    app.add_handler(CommandHandler("create_task", create_task))
+    app.add_handler(CommandHandler("create_tasks", create_tasks))
+    app.add_handler(CommandHandler("assign", assign_task))
+    app.add_handler(CommandHandler("assign_many", assign_many))
+    app.add_handler(CommandHandler("set_status", set_status))
+    app.add_handler(CommandHandler("working", working_task))
+    app.add_handler(CommandHandler("completed", completed_task))
+    app.add_handler(CommandHandler("tasks", list_tasks))
+    app.add_handler(CommandHandler("history", task_history))
+    app.add_handler(CallbackQueryHandler(task_page_callback, pattern=r"^[th]\|"))
+    app.add_handler(CommandHandler("delete_task", delete_task_by_id))
+    app.add_handler(CommandHandler("task_details", task_details))
+    app.add_handler(CommandHandler("summary", summary))
+    app.add_handler(CommandHandler("create_project", create_project))
+    app.add_handler(CommandHandler("delete_project", delete_project))
+    app.add_handler(CommandHandler("project_details", project_details))
+    app.add_handler(CommandHandler("project_files", project_files))
+    app.add_handler(MessageHandler(filters.Document.ALL, handle_document_upload))
+    app.add_handler(CommandHandler("get_files", get_files))
+    app.add_error_handler(handle_error)
+    return app
+
+def main():
+    print(f"✅ Bot script started. Listening for mentions of: @{BOT_USERNAME}")
+    app = build_application()
 
-# --- Main execution block ---
-if __name__ == "__main__":
     # Start the Flask server in a separate thread
     flask_thread = threading.Thread(target=run_flask)
     flask_thread.daemon = True
@@ -97,4 +168,8 @@ if __name__ == "__main__":
 
     # Start the Telegram bot's polling
     print("Starting bot polling...")
-    asyncio.run(app.run_polling())
\ No newline at end of file
+    asyncio.run(app.run_polling())
+
+# --- Main execution block ---
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+-- 001_task_title_search.sql
+-- Trigram index on task titles and a scoped fuzzy title search used by
+-- services/task_search.py (TASK_SEARCH_BACKEND=rpc).
+
+create extension if not exists pg_trgm;
+
+create index if not exists tasks_title_trgm_idx
+    on public.tasks using gin (lower(title) gin_trgm_ops);
+
+create index if not exists tasks_group_status_idx
+    on public.tasks (group_id, status);
+
+create index if not exists tasks_assigned_status_idx
+    on public.tasks (assigned_to, status);
+
+-- Returns the best title matches for p_query, optionally scoped to a group,
+-- a set of statuses and an assignee. "exact" rows contain p_query as a
+-- case-insensitive substring; the rest are trigram-similar (pg_trgm's %).
+-- Each task is returned as JSON with the project name joined in as
+-- {"projects": {"name": ...}}, matching the bot's select("*, projects(name)").
+create or replace function public.search_tasks(
+    p_query text,
+    p_group_id bigint default null,
+    p_statuses text[] default null,
+    p_assigned_to uuid default null,
+    p_limit integer default 10
+)
+returns table (task jsonb, score real, exact boolean)
+language sql
+stable
+as $$
+    with q as (
+        select lower(p_query) as needle,
+               '%' || replace(replace(replace(lower(p_query), '\', '\\'), '%', '\%'), '_', '\_') || '%' as pattern
+    )
+    select to_jsonb(t)
+               || jsonb_build_object('projects', case when p.id is null then null
+                                                      else jsonb_build_object('name', p.name) end) as task,
+           similarity(lower(t.title), q.needle) as score,
+           lower(t.title) like q.pattern as exact
+    from public.tasks t
+    cross join q
+    left join public.projects p on p.id = t.project_id
+    where (p_group_id is null or t.group_id = p_group_id)
+      and (p_statuses is null or t.status = any (p_statuses))
+      and (p_assigned_to is null or t.assigned_to = p_assigned_to)
+      and (lower(t.title) like q.pattern or lower(t.title) % q.needle)
+    order by exact desc, score desc, t.created_at desc
+    limit greatest(p_limit, 1);
+$$;
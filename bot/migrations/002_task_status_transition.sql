@@ -0,0 +1,39 @@
+-- 002_task_status_transition.sql
+-- Moves a task to a new status and writes its status_logs row in a single
+-- transaction. Used by the assign/working/completed services.
+
+create or replace function public.transition_task_status(
+    p_task_id uuid,
+    p_expected_status text,
+    p_new_status text,
+    p_log_status text,
+    p_employee_id uuid,
+    p_group_id bigint default null,
+    p_notes text default null,
+    p_assigned_to uuid default null
+)
+returns setof public.tasks
+language plpgsql
+as $$
+declare
+    v_task public.tasks;
+begin
+    -- Only transition from the status the caller saw; otherwise return no row.
+    update public.tasks
+       set status = p_new_status,
+           assigned_to = coalesce(p_assigned_to, assigned_to),
+           updated_at = now()
+     where id = p_task_id
+       and status = p_expected_status
+    returning * into v_task;
+
+    if not found then
+        return;
+    end if;
+
+    insert into public.status_logs (task_id, employee_id, status, group_id, notes)
+    values (p_task_id, p_employee_id, p_log_status, p_group_id, p_notes);
+
+    return next v_task;
+end;
+$$;
@@ -0,0 +1,9 @@
+-- 003_pagination_indexes.sql
+-- Indexes backing the keyset-paginated /tasks and /history pages
+-- (ordered by created_at / timestamp with id as the tie-breaker).
+
+create index if not exists tasks_assigned_created_idx
+    on public.tasks (assigned_to, created_at desc, id desc);
+
+create index if not exists status_logs_task_timestamp_idx
+    on public.status_logs (task_id, "timestamp", id);
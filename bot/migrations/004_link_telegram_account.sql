@@ -0,0 +1,80 @@
+-- 004_link_telegram_account.sql
+-- The whole /link flow in one transaction: verify and consume the one-time
+-- code, upsert telegram_users, register the group (first linker becomes its
+-- admin) and record the role. Used by handlers/link_handler.py.
+--
+-- result is one of 'linked', 'invalid', 'used', 'expired'; linked_user_id
+-- and assigned_role are only set when result = 'linked'.
+
+create or replace function public.link_telegram_account(
+    p_code text,
+    p_telegram_id bigint,
+    p_telegram_username text,
+    p_group_id bigint default null,
+    p_group_name text default null
+)
+returns table (result text, linked_user_id uuid, assigned_role text)
+language plpgsql
+as $$
+declare
+    v_otc public.otc_codes;
+    v_role text := 'developer';
+begin
+    -- Lock the code so two concurrent /link calls cannot both consume it.
+    select * into v_otc from public.otc_codes where code = p_code for update;
+
+    if not found then
+        return query select 'invalid'::text, null::uuid, null::text;
+        return;
+    end if;
+    if v_otc.used then
+        return query select 'used'::text, null::uuid, null::text;
+        return;
+    end if;
+    if v_otc.expires_at < now() then
+        return query select 'expired'::text, null::uuid, null::text;
+        return;
+    end if;
+
+    insert into public.telegram_users as tu (id, telegram_id, telegram_username, last_seen_at, valid)
+    values (v_otc.user_id, p_telegram_id, p_telegram_username, now(), true)
+    on conflict (id) do update
+        set telegram_id = excluded.telegram_id,
+            telegram_username = excluded.telegram_username,
+            last_seen_at = excluded.last_seen_at,
+            valid = true;
+
+    if p_group_id is not null then
+        -- Serialize linking per group so only one user can become its first admin.
+        perform pg_advisory_xact_lock(p_group_id);
+
+        insert into public.groups (group_id, group_name, admin_id)
+        values (p_group_id, coalesce(p_group_name, 'Unnamed Group'), v_otc.user_id)
+        on conflict (group_id) do nothing;
+
+        if found then
+            v_role := 'admin';
+        else
+            update public.groups
+               set admin_id = v_otc.user_id
+             where group_id = p_group_id
+               and admin_id is null;
+
+            if found then
+                v_role := 'admin';
+            elsif not exists (
+                select 1 from public.roles r where r.group_id = p_group_id and r.role = 'admin'
+            ) then
+                v_role := 'admin';
+            end if;
+        end if;
+    end if;
+
+    insert into public.roles (user_id, group_id, role)
+    values (v_otc.user_id, p_group_id, v_role);
+
+    update public.otc_codes set used = true where code = p_code;
+
+    return query select 'linked'::text, v_otc.user_id, v_role;
+end;
+$$;
@@ -0,0 +1,74 @@
+-- 005_delete_project_cascade.sql
+-- Deletes a project with everything that hangs off it in one transaction:
+-- its tasks' status_logs, its tasks, its project_files rows and the project
+-- row itself. Storage objects cannot be deleted from SQL, so their paths are
+-- returned for the caller to remove through the Storage API, together with
+-- their total size from storage.objects. Used by services/project_service.py.
+--
+-- p_group_id is required: only a project of that group is deleted (the
+-- caller has checked that the user is an admin of the group).
+
+-- Earlier versions gave p_group_id a default, which create or replace
+-- cannot remove.
+drop function if exists public.delete_project_cascade(uuid, bigint);
+
+create or replace function public.delete_project_cascade(
+    p_project_id uuid,
+    p_group_id bigint
+)
+returns table (
+    project_name text,
+    project_group_id bigint,
+    tasks_deleted integer,
+    logs_deleted integer,
+    files_deleted integer,
+    storage_paths text[],
+    storage_bytes bigint
+)
+language plpgsql
+as $$
+declare
+    v_project public.projects;
+    v_paths text[];
+    v_bytes bigint;
+    v_tasks integer;
+    v_logs integer;
+    v_files integer;
+begin
+    select * into v_project
+      from public.projects p
+     where p.id = p_project_id
+       and p.group_id = p_group_id
+       for update;
+
+    if not found then
+        return;
+    end if;
+
+    select coalesce(array_agg('project-files/' || f.custom_name), '{}')
+      into v_paths
+      from public.project_files f
+     where f.project_id = p_project_id and f.custom_name is not null;
+
+    select coalesce(sum((o.metadata ->> 'size')::bigint), 0)
+      into v_bytes
+      from storage.objects o
+     where o.bucket_id = 'project-file-storage'
+       and o.name = any (v_paths);
+
+    delete from public.status_logs l
+     using public.tasks t
+     where l.task_id = t.id and t.project_id = p_project_id;
+    get diagnostics v_logs = row_count;
+
+    delete from public.tasks t where t.project_id = p_project_id;
+    get diagnostics v_tasks = row_count;
+
+    delete from public.project_files f where f.project_id = p_project_id;
+    get diagnostics v_files = row_count;
+
+    delete from public.projects p where p.id = p_project_id;
+
+    return query select v_project.name, v_project.group_id, v_tasks, v_logs, v_files, v_paths, v_bytes;
+end;
+$$;
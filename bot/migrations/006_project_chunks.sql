@@ -0,0 +1,88 @@
+-- 006_project_chunks.sql
+-- One row per embedded chunk of an uploaded project file, searched
+-- server-side with pgvector. Replaces the JSON array of chunks and
+-- embeddings that uploads used to write into projects.raw_input.
+-- Used by services/chunk_store.py.
+--
+-- The vector size matches the default EMBEDDING_MODEL
+-- (paraphrase-MiniLM-L3-v2, 384 dimensions).
+
+create extension if not exists vector;
+
+create table if not exists public.project_chunks (
+    id bigserial primary key,
+    project_id uuid not null references public.projects (id) on delete cascade,
+    file_id uuid references public.project_files (id) on delete cascade,
+    chunk_index integer not null,
+    char_start integer,
+    content text not null,
+    embedding vector(384) not null,
+    created_at timestamptz not null default now()
+);
+
+-- Searches are always scoped to one project, whose chunks are few enough
+-- to rank exactly; an ANN index would filter after the fact and could
+-- return fewer than p_match_count rows.
+create index if not exists project_chunks_project_idx
+    on public.project_chunks (project_id, file_id, chunk_index);
+
+-- Top-k chunks of a project by cosine similarity to p_query_embedding.
+-- Only created while the column is still vector(384): once 007 has moved it
+-- to halfvec, re-running this file must not bring the vector overload back.
+do $do$
+begin
+    if (
+        select format_type(a.atttypid, a.atttypmod)
+          from pg_attribute a
+         where a.attrelid = 'public.project_chunks'::regclass
+           and a.attname = 'embedding'
+    ) = 'vector(384)' then
+        create or replace function public.match_project_chunks(
+            p_project_id uuid,
+            p_query_embedding vector(384),
+            p_match_count integer default 5
+        )
+        returns table (id bigint, file_id uuid, chunk_index integer, content text, similarity real)
+        language sql
+        stable
+        as $$
+            select c.id, c.file_id, c.chunk_index, c.content,
+                   (1 - (c.embedding <=> p_query_embedding))::real as similarity
+              from public.project_chunks c
+             where c.project_id = p_project_id
+             order by c.embedding <=> p_query_embedding
+             limit p_match_count;
+        $$;
+    end if;
+end;
+$do$;
+
+-- Move chunks stored by earlier versions in projects.raw_input (a JSON array
+-- of {"content", "embedding"}) into the new table and clear the column.
+-- raw_input may also hold free text from /create_project, which is left alone.
+do $$
+declare
+    v_project record;
+    v_chunks jsonb;
+begin
+    for v_project in
+        select id, raw_input from public.projects where raw_input like '[{%'
+    loop
+        begin
+            v_chunks := v_project.raw_input::jsonb;
+        exception when others then
+            continue;
+        end;
+
+        if jsonb_typeof(v_chunks) <> 'array' or not (v_chunks -> 0 ? 'embedding') then
+            continue;
+        end if;
+
+        insert into public.project_chunks (project_id, chunk_index, content, embedding)
+        select v_project.id, (c.ordinality - 1)::integer, c.value ->> 'content', (c.value ->> 'embedding')::vector
+          from jsonb_array_elements(v_chunks) with ordinality as c (value, ordinality);
+
+        update public.projects set raw_input = null where id = v_project.id;
+    end loop;
+end;
+$$;
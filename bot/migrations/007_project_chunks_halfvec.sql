@@ -0,0 +1,40 @@
+-- 007_project_chunks_halfvec.sql
+-- Stores project_chunks embeddings as halfvec (2 bytes per dimension instead
+-- of 4), halving the table and the data read by match_project_chunks.
+-- Sentence embeddings lose no measurable recall at float16 precision
+-- (see benchmarks/embedding_recall.py). Needs pgvector 0.7 or later.
+
+do $$
+begin
+    if (
+        select format_type(a.atttypid, a.atttypmod)
+          from pg_attribute a
+         where a.attrelid = 'public.project_chunks'::regclass
+           and a.attname = 'embedding'
+    ) <> 'halfvec(384)' then
+        alter table public.project_chunks
+            alter column embedding type halfvec(384) using embedding::halfvec(384);
+    end if;
+end;
+$$;
+
+-- The parameter type changes, so the vector(384) version is dropped rather
+-- than left behind as an overload.
+drop function if exists public.match_project_chunks(uuid, vector, integer);
+
+create or replace function public.match_project_chunks(
+    p_project_id uuid,
+    p_query_embedding halfvec(384),
+    p_match_count integer default 5
+)
+returns table (id bigint, file_id uuid, chunk_index integer, content text, similarity real)
+language sql
+stable
+as $$
+    select c.id, c.file_id, c.chunk_index, c.content,
+           (1 - (c.embedding <=> p_query_embedding))::real as similarity
+      from public.project_chunks c
+     where c.project_id = p_project_id
+     order by c.embedding <=> p_query_embedding
+     limit p_match_count;
+$$;
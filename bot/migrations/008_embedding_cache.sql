@@ -0,0 +1,16 @@
+-- 008_embedding_cache.sql
+-- Embeddings of chunk texts the bot has already embedded, keyed by model and
+-- the SHA-256 of the text, so re-uploading a revised file only embeds the
+-- chunks that changed. Used by services/embedding_cache.py.
+--
+-- embedding is a base64 float16 blob in the services/embedding_codec.py
+-- format rather than a pgvector column, so the cache also works for
+-- RAG_BACKEND=local deployments without the extension.
+
+create table if not exists public.embedding_cache (
+    model text not null,
+    content_hash text not null,
+    embedding text not null,
+    created_at timestamptz not null default now(),
+    primary key (model, content_hash)
+);
@@ -0,0 +1,32 @@
+-- 009_ingestion_jobs.sql
+-- Uploaded files waiting for or going through ingestion (storage upload,
+-- text extraction, embedding), so a restart resumes them instead of
+-- dropping them. Used by services/ingestion_queue.py.
+--
+-- stage is the next step to run ('store' or 'index'); chunks_done is how
+-- many chunks the index step has stored, which it skips when resumed.
+
+create table if not exists public.ingestion_jobs (
+    id uuid primary key,
+    project_id uuid not null references public.projects (id) on delete cascade,
+    file_id uuid not null,
+    chat_id bigint not null,
+    message_id bigint,
+    telegram_file_id text not null,
+    file_name text not null,
+    storage_name text not null,
+    mime_type text,
+    uploaded_by uuid,
+    status text not null default 'queued' check (status in ('queued', 'running', 'done', 'failed')),
+    stage text not null default 'store' check (stage in ('store', 'index')),
+    chunks_done integer not null default 0,
+    attempts integer not null default 0,
+    error text,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+-- The start-up scan only looks at unfinished jobs.
+create index if not exists ingestion_jobs_pending_idx
+    on public.ingestion_jobs (created_at)
+    where status in ('queued', 'running');
@@ -0,0 +1,211 @@
+-- 010_project_chunks_keywords.sql
+-- Keyword side of hybrid retrieval: a generated tsvector of each chunk
+-- (the 'simple' configuration keeps identifiers such as "jira-1234" and
+-- names unstemmed) with a GIN index, per-project BM25 statistics kept up
+-- to date as chunks are stored and deleted, and
+-- match_project_chunks_hybrid, which fuses the dense ranking with a BM25
+-- ranking by reciprocal rank fusion. Used by services/chunk_store.py.
+--
+-- Adding the generated column computes it for existing chunks, and the
+-- statistics are rebuilt from project_chunks on every run.
+
+alter table public.project_chunks
+    add column if not exists content_tsv tsvector
+    generated always as (to_tsvector('simple', content)) stored;
+
+create index if not exists project_chunks_content_tsv_idx
+    on public.project_chunks using gin (content_tsv);
+
+-- Number of a project's chunks containing each lexeme (BM25 document frequency).
+create table if not exists public.project_term_stats (
+    project_id uuid not null references public.projects (id) on delete cascade,
+    lexeme text not null,
+    df integer not null,
+    primary key (project_id, lexeme)
+);
+
+-- A project's chunk count and total chunk length (distinct lexemes), for
+-- BM25's average document length.
+create table if not exists public.project_chunk_stats (
+    project_id uuid primary key references public.projects (id) on delete cascade,
+    chunks integer not null,
+    total_length bigint not null
+);
+
+-- Statement-level triggers, so a batch insert updates each lexeme's row once.
+create or replace function public.project_chunks_stats_added()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.project_term_stats as s (project_id, lexeme, df)
+    select a.project_id, l.lexeme, count(*)
+      from added a
+     cross join lateral unnest(a.content_tsv) as l
+     group by a.project_id, l.lexeme
+     -- A fixed lock order keeps concurrent batches of a project from deadlocking.
+     order by a.project_id, l.lexeme
+    on conflict (project_id, lexeme) do update set df = s.df + excluded.df;
+
+    insert into public.project_chunk_stats as s (project_id, chunks, total_length)
+    select a.project_id, count(*), sum(length(a.content_tsv))
+      from added a
+     group by a.project_id
+    on conflict (project_id) do update
+        set chunks = s.chunks + excluded.chunks,
+            total_length = s.total_length + excluded.total_length;
+    return null;
+end;
+$$;
+
+create or replace function public.project_chunks_stats_removed()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.project_term_stats s
+       set df = s.df - r.df
+      from (
+          select o.project_id, l.lexeme, count(*) as df
+            from removed o
+           cross join lateral unnest(o.content_tsv) as l
+           group by o.project_id, l.lexeme
+      ) r
+     where s.project_id = r.project_id
+       and s.lexeme = r.lexeme;
+    delete from public.project_term_stats s
+     where s.df <= 0
+       and s.project_id in (select distinct o.project_id from removed o);
+
+    update public.project_chunk_stats s
+       set chunks = s.chunks - r.chunks,
+           total_length = s.total_length - r.total_length
+      from (
+          select o.project_id, count(*) as chunks, sum(length(o.content_tsv)) as total_length
+            from removed o
+           group by o.project_id
+      ) r
+     where s.project_id = r.project_id;
+    return null;
+end;
+$$;
+
+drop trigger if exists project_chunks_stats_added on public.project_chunks;
+create trigger project_chunks_stats_added
+    after insert on public.project_chunks
+    referencing new table as added
+    for each statement execute function public.project_chunks_stats_added();
+
+drop trigger if exists project_chunks_stats_removed on public.project_chunks;
+create trigger project_chunks_stats_removed
+    after delete on public.project_chunks
+    referencing old table as removed
+    for each statement execute function public.project_chunks_stats_removed();
+
+-- Rebuild the statistics of the chunks stored so far (with writes held off).
+do $$
+begin
+    lock table public.project_chunks in share mode;
+
+    delete from public.project_term_stats;
+    insert into public.project_term_stats (project_id, lexeme, df)
+    select c.project_id, l.lexeme, count(*)
+      from public.project_chunks c
+     cross join lateral unnest(c.content_tsv) as l
+     group by c.project_id, l.lexeme;
+
+    delete from public.project_chunk_stats;
+    insert into public.project_chunk_stats (project_id, chunks, total_length)
+    select c.project_id, count(*), sum(length(c.content_tsv))
+      from public.project_chunks c
+     group by c.project_id;
+end;
+$$;
+
+-- The question's terms are the lexemes of to_tsvector('simple', p_query),
+-- less p_stopwords, so they are split exactly like the chunks' content_tsv
+-- ("2024-05-01", "v2.3"); any of them may match. The GIN index finds the
+-- matching chunks and ts_rank_cd keeps the best 5 x p_candidates of them;
+-- only those are scored by BM25 (k1 = 1.2, b = 0.75, with the number of
+-- distinct lexemes as the chunk length), using the precomputed statistics.
+drop function if exists public.match_project_chunks_hybrid(uuid, halfvec, text[], integer, integer, integer);
+
+create or replace function public.match_project_chunks_hybrid(
+    p_project_id uuid,
+    p_query_embedding halfvec(384),
+    p_query text,
+    p_match_count integer default 5,
+    p_candidates integer default 20,
+    p_rrf_k integer default 60,
+    p_stopwords text[] default '{}'
+)
+returns table (id bigint, file_id uuid, chunk_index integer, content text, similarity real, score real)
+language sql
+stable
+as $$
+    with terms as (
+        select array_agg(l.lexeme) as lexemes,
+               to_tsquery('simple', string_agg(quote_literal(l.lexeme), ' | ')) as query
+          from unnest(to_tsvector('simple', p_query)) as l
+         where l.lexeme <> all (p_stopwords)
+    ),
+    dense as (
+        select c.id, row_number() over (order by c.embedding <=> p_query_embedding) as rank
+          from public.project_chunks c
+         where c.project_id = p_project_id
+         order by c.embedding <=> p_query_embedding
+         limit p_candidates
+    ),
+    corpus as (
+        select s.chunks::real as n, greatest(s.total_length::real / greatest(s.chunks, 1), 1) as avg_length
+          from public.project_chunk_stats s
+         where s.project_id = p_project_id
+    ),
+    matches as (
+        select c.id, c.content_tsv
+          from public.project_chunks c
+         cross join terms
+         where c.project_id = p_project_id
+           and c.content_tsv @@ terms.query
+         order by ts_rank_cd(c.content_tsv, terms.query) desc
+         limit 5 * p_candidates
+    ),
+    hits as (
+        -- One row per (candidate chunk, query term it contains).
+        select m.id, length(m.content_tsv)::real as length, l.lexeme,
+               coalesce(array_length(l.positions, 1), 1)::real as tf
+          from matches m
+         cross join terms
+         cross join lateral unnest(m.content_tsv) as l
+         where l.lexeme = any (terms.lexemes)
+    ),
+    sparse as (
+        select b.id, row_number() over (order by b.bm25 desc) as rank
+          from (
+              select h.id,
+                     sum(ln(1 + (corpus.n - t.df + 0.5) / (t.df + 0.5))
+                         * h.tf * 2.2 / (h.tf + 1.2 * (0.25 + 0.75 * h.length / corpus.avg_length))) as bm25
+                from hits h
+                join public.project_term_stats t
+                  on t.project_id = p_project_id
+                 and t.lexeme = h.lexeme
+               cross join corpus
+               group by h.id
+          ) b
+         order by b.bm25 desc
+         limit p_candidates
+    ),
+    fused as (
+        select coalesce(d.id, s.id) as id,
+               coalesce(1.0 / (p_rrf_k + d.rank), 0) + coalesce(1.0 / (p_rrf_k + s.rank), 0) as score
+          from dense d
+          full outer join sparse s on s.id = d.id
+    )
+    select c.id, c.file_id, c.chunk_index, c.content,
+           (1 - (c.embedding <=> p_query_embedding))::real as similarity,
+           f.score::real as score
+      from fused f
+      join public.project_chunks c on c.id = f.id
+     order by f.score desc
+     limit p_match_count;
+$$;
@@ -0,0 +1,16 @@
+-- 011_project_chunks_unique.sql
+-- One row per (file_id, chunk_index) in project_chunks. An ingestion job
+-- resumed after a failure may store its last batch again; the bot inserts
+-- with "on conflict do nothing" against this index, so the batch is not
+-- duplicated. Used by services/chunk_store.py.
+--
+-- Duplicates left by earlier versions are removed first, keeping the oldest row.
+
+delete from public.project_chunks c
+ using public.project_chunks d
+ where c.file_id = d.file_id
+   and c.chunk_index = d.chunk_index
+   and c.id > d.id;
+
+create unique index if not exists project_chunks_file_chunk_idx
+    on public.project_chunks (file_id, chunk_index);
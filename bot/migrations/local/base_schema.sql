@@ -0,0 +1,88 @@
+-- local/base_schema.sql
+-- Minimal copy of the Supabase tables the bot uses, for testing the
+-- numbered migrations against a plain local Postgres. Not for production:
+-- the real tables are managed by the web app's Supabase project.
+
+create extension if not exists pgcrypto;
+
+create table if not exists public.telegram_users (
+    id uuid primary key,
+    telegram_id bigint unique,
+    telegram_username text,
+    last_seen_at timestamptz,
+    valid boolean default true
+);
+
+create table if not exists public.otc_codes (
+    code text primary key,
+    user_id uuid not null,
+    expires_at timestamptz not null,
+    used boolean not null default false
+);
+
+create table if not exists public.groups (
+    group_id bigint primary key,
+    group_name text,
+    admin_id uuid
+);
+
+create table if not exists public.roles (
+    id bigserial primary key,
+    user_id uuid not null,
+    group_id bigint,
+    role text not null
+);
+
+create table if not exists public.projects (
+    id uuid primary key default gen_random_uuid(),
+    name text not null,
+    description text,
+    owner_id uuid,
+    group_id bigint,
+    raw_input text,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists public.tasks (
+    id uuid primary key default gen_random_uuid(),
+    title text not null,
+    description text,
+    status text not null default 'Pending',
+    group_id bigint,
+    project_id uuid references public.projects (id),
+    parent_task_id uuid references public.tasks (id),
+    assigned_to uuid,
+    deadline date,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create table if not exists public.status_logs (
+    id bigserial primary key,
+    task_id uuid references public.tasks (id),
+    employee_id uuid,
+    status text,
+    group_id bigint,
+    notes text,
+    "timestamp" timestamptz not null default now()
+);
+
+create table if not exists public.project_files (
+    id uuid primary key default gen_random_uuid(),
+    project_id uuid references public.projects (id),
+    filename text,
+    custom_name text,
+    type text,
+    uploaded_by uuid,
+    created_at timestamptz not null default now()
+);
+
+-- Stand-in for Supabase Storage's object table (only the columns read by migrations).
+create schema if not exists storage;
+
+create table if not exists storage.objects (
+    id uuid primary key default gen_random_uuid(),
+    bucket_id text,
+    name text,
+    metadata jsonb
+);
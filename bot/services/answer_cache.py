@@ -0,0 +1,129 @@
+# bot/services/answer_cache.py
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+
+import numpy as np
+
+from utils.cache import TTLCache
+from services.keyword_index import STOPWORDS
+
+# Answers to project questions, reused when the same question (or a close
+# paraphrase) is asked again about the same project: no retrieval and no LLM
+# call. Entries expire after ANSWER_CACHE_TTL seconds, each project keeps its
+# ANSWER_CACHE_PER_PROJECT most recently used answers, and any new upload to
+# a project drops its answers.
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_PROJECTS = int(os.getenv("ANSWER_CACHE_PROJECTS", "200"))
+ANSWER_CACHE_PER_PROJECT = int(os.getenv("ANSWER_CACHE_PER_PROJECT", "50"))
+# Cosine similarity between question embeddings needed for a hit.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+# Identifiers and names ("JIRA-1234", "Atlas", "Q3"): questions that differ
+# only in these embed almost identically, so they must match exactly. The
+# capital at the start of the question does not count.
+_KEY_TERM = re.compile(r"\b(?:\w*\d[\w-]*|[A-Z][\w-]*)")
+
+
+class CachedAnswer(NamedTuple):
+    embedding: np.ndarray
+    key_terms: FrozenSet[str]
+    answer: str
+    expires_at: float
+
+
+def _key_terms(question: str) -> FrozenSet[str]:
+    question = question.strip()
+    question = question[:1].lower() + question[1:]
+    return frozenset(term.lower() for term in _KEY_TERM.findall(question) if term.lower() not in STOPWORDS)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ProjectAnswers:
+    """One project's cached answers, least recently used first."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+
+    def find(self, embedding: np.ndarray, key_terms: FrozenSet[str], threshold: float) -> Optional[str]:
+        now = time.monotonic()
+        best_question, best_score = None, threshold
+        for question, entry in list(self.entries.items()):
+            if entry.expires_at <= now:
+                del self.entries[question]
+                continue
+            if entry.key_terms != key_terms:
+                continue
+            score = float(entry.embedding @ embedding)
+            if score >= best_score:
+                best_question, best_score = question, score
+        if best_question is None:
+            return None
+        self.entries.move_to_end(best_question)
+        return self.entries[best_question].answer
+
+    def add(self, question: str, entry: CachedAnswer, limit: int) -> None:
+        self.entries[question] = entry
+        self.entries.move_to_end(question)
+        while len(self.entries) > limit:
+            self.entries.popitem(last=False)
+
+
+_answers = TTLCache(maxsize=ANSWER_CACHE_PROJECTS, ttl=ANSWER_CACHE_TTL)  # project_id -> ProjectAnswers
+_counters = {"hits": 0, "misses": 0, "invalidations": 0, "stale_skips": 0}
+# Bumped by every invalidation. An answer is only cached if its project's
+# generation did not change while it was being built, so an answer built
+# from chunks read before an upload is never cached after it.
+_generations: Dict[str, int] = {}
+
+
+def answer_generation(project_id: str) -> int:
+    """The project's current generation; read it before retrieving chunks."""
+    return _generations.get(str(project_id), 0)
+
+
+def get_cached_answer(project_id: str, question: str, embedding: np.ndarray) -> Optional[str]:
+    """A cached answer to `question` (or a paraphrase of it) about the project, if any."""
+    answers = _answers.peek(str(project_id))
+    answer = answers.find(_unit(embedding), _key_terms(question), ANSWER_CACHE_THRESHOLD) if answers else None
+    _counters["hits" if answer is not None else "misses"] += 1
+    return answer
+
+
+def cache_answer(project_id: str, question: str, embedding: np.ndarray, answer: str, generation: int) -> None:
+    """Caches an answer built from what the project held at `generation` (see answer_generation)."""
+    if answer_generation(project_id) != generation:
+        _counters["stale_skips"] += 1
+        return
+    answers = _answers.peek(str(project_id)) or ProjectAnswers()
+    answers.add(
+        " ".join(question.lower().split()),
+        CachedAnswer(_unit(embedding), _key_terms(question), answer, time.monotonic() + ANSWER_CACHE_TTL),
+        ANSWER_CACHE_PER_PROJECT,
+    )
+    # Re-setting refreshes the project's expiry and LRU position.
+    _answers.set(str(project_id), answers)
+
+
+def invalidate_project_answers(project_id: str) -> None:
+    """Drops a project's cached answers, e.g. after a new file was indexed into it."""
+    _generations[str(project_id)] = answer_generation(project_id) + 1
+    if _answers.peek(str(project_id)) is not None:
+        _counters["invalidations"] += 1
+    _answers.invalidate(str(project_id))
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        "projects": len(_answers),
+        **_counters,
+        "hit_rate": round(_counters["hits"] / lookups, 3) if lookups else None,
+    }
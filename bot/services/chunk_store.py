@@ -0,0 +1,134 @@
+# bot/services/chunk_store.py
+import asyncio
+import functools
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from postgrest.types import ReturnMethod
+
+from utils.db import get_db
+from services import embedding_codec, vector_index
+from services.keyword_index import STOPWORDS
+
+# "pgvector" keeps chunks in project_chunks (migrations/006_project_chunks.sql)
+# and ranks them server-side; "local" keeps them in the memory-mapped files of
+# services/vector_index.py, for databases without pgvector; its file work
+# and scoring run in worker threads, off the event loop.
+RAG_BACKEND = os.getenv("RAG_BACKEND", "pgvector")
+# pgvector chunks are inserted in batches of this many rows.
+CHUNK_INSERT_BATCH = int(os.getenv("CHUNK_INSERT_BATCH", "200"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+# Hybrid retrieval: the best RAG_CANDIDATES chunks by embedding similarity
+# and by BM25 keyword score are merged by reciprocal rank fusion (constant
+# RAG_RRF_K), so exact identifiers in the question are not missed.
+RAG_HYBRID = os.getenv("RAG_HYBRID", "1") == "1"
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "20"))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+
+async def _in_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def store_chunks(
+    project_id: str,
+    file_id: Optional[str],
+    chunks: List[Dict[str, Any]],
+    embeddings: np.ndarray,
+    first_index: int = 0,
+) -> int:
+    """
+    Appends a file's chunks to the project's chunk store. Each chunk is a
+    dict with "content" and optionally "char_start"; `embeddings` has one
+    row per chunk. Returns the number of rows written.
+    """
+    if RAG_BACKEND == "local":
+        return await _in_thread(vector_index.append_chunks, project_id, [
+            {"content": chunk["content"], "file_id": file_id, "chunk_index": first_index + i, "char_start": chunk.get("char_start")}
+            for i, chunk in enumerate(chunks)
+        ], embeddings)
+
+    db = await get_db()
+    rows = [
+        {
+            "project_id": project_id,
+            "file_id": file_id,
+            "chunk_index": first_index + i,
+            "char_start": chunk.get("char_start"),
+            "content": chunk["content"],
+            "embedding": embedding_codec.vector_literal(embeddings[i]),
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+    # Embeddings go out as float16-precision literals (the column is halfvec,
+    # migrations/007_project_chunks_halfvec.sql); returning=minimal keeps
+    # them from being sent back. Chunks already stored by an earlier attempt
+    # are skipped (migrations/011_project_chunks_unique.sql).
+    for start in range(0, len(rows), CHUNK_INSERT_BATCH):
+        await db.from_("project_chunks").upsert(
+            rows[start:start + CHUNK_INSERT_BATCH],
+            on_conflict="file_id,chunk_index",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal,
+        ).execute()
+    return len(rows)
+
+
+async def match_chunks(
+    project_id: str,
+    query_embedding: np.ndarray,
+    k: int = RAG_TOP_K,
+    query_text: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    The project's k best chunks for a query, best first: by similarity to
+    `query_embedding`, fused with keyword matches of `query_text` when given.
+    """
+    # Each backend splits the question into terms the way it split the chunks.
+    hybrid = RAG_HYBRID and bool(query_text and query_text.strip())
+
+    if RAG_BACKEND == "local":
+        return await _in_thread(
+            vector_index.search, project_id, np.asarray(query_embedding, dtype=np.float32).ravel(), k,
+            query_text=query_text if hybrid else None,
+            candidates=RAG_CANDIDATES, rrf_k=RAG_RRF_K,
+        )
+
+    db = await get_db()
+    if hybrid:
+        response = await db.rpc("match_project_chunks_hybrid", {
+            "p_project_id": project_id,
+            "p_query_embedding": embedding_codec.vector_literal(query_embedding),
+            "p_query": query_text,
+            "p_match_count": k,
+            "p_candidates": RAG_CANDIDATES,
+            "p_rrf_k": RAG_RRF_K,
+            "p_stopwords": sorted(STOPWORDS),
+        }).execute()
+        return response.data or []
+
+    response = await db.rpc("match_project_chunks", {
+        "p_project_id": project_id,
+        "p_query_embedding": embedding_codec.vector_literal(query_embedding),
+        "p_match_count": k,
+    }).execute()
+    return response.data or []
+
+
+async def drop_file_chunks(project_id: str, file_id: str) -> int:
+    """
+    Removes one file's chunks from the local index. pgvector rows cascade
+    when the file's project_files row is deleted. Returns the number removed.
+    """
+    if RAG_BACKEND == "local":
+        return await _in_thread(vector_index.remove_file, project_id, file_id)
+    return 0
+
+
+async def drop_chunks(project_id: str) -> None:
+    """Removes a deleted project's local index (pgvector rows cascade with the project)."""
+    if RAG_BACKEND == "local":
+        await _in_thread(vector_index.drop_index, project_id)
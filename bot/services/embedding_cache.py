@@ -0,0 +1,108 @@
+# bot/services/embedding_cache.py
+import base64
+import hashlib
+import os
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+from postgrest.types import ReturnMethod
+
+from utils.db import get_db
+from services import embedding_codec
+from services.embedding_service import embedding_service
+
+# Embeddings of chunk texts already seen, keyed by (model, sha256 of the text),
+# in the embedding_cache table (migrations/008_embedding_cache.sql). Each
+# vector is a base64 embedding_codec float16 blob, so the table works with
+# either RAG backend. Re-uploading a revised file only embeds the chunks
+# whose text changed.
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") == "1"
+# Hashes per lookup request (they travel in the query string).
+EMBEDDING_CACHE_LOOKUP_BATCH = int(os.getenv("EMBEDDING_CACHE_LOOKUP_BATCH", "100"))
+EMBEDDING_CACHE_WRITE_BATCH = int(os.getenv("EMBEDDING_CACHE_WRITE_BATCH", "200"))
+
+_counters = {"hits": 0, "misses": 0, "lookup_errors": 0, "write_errors": 0}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: np.ndarray) -> str:
+    return base64.b64encode(embedding_codec.encode_vectors(vector.reshape(1, -1), "float16")).decode("ascii")
+
+
+def _unpack(value: str) -> np.ndarray:
+    return embedding_codec.decode_vectors(base64.b64decode(value))[0]
+
+
+async def _lookup(model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+    db = await get_db()
+    found = {}
+    for start in range(0, len(hashes), EMBEDDING_CACHE_LOOKUP_BATCH):
+        response = await (
+            db.from_("embedding_cache")
+            .select("content_hash, embedding")
+            .eq("model", model)
+            .in_("content_hash", hashes[start:start + EMBEDDING_CACHE_LOOKUP_BATCH])
+            .execute()
+        )
+        for row in response.data or []:
+            found[row["content_hash"]] = _unpack(row["embedding"])
+    return found
+
+
+async def _store(model: str, vectors: Dict[str, np.ndarray]) -> None:
+    db = await get_db()
+    rows = [{"model": model, "content_hash": h, "embedding": _pack(v)} for h, v in vectors.items()]
+    for start in range(0, len(rows), EMBEDDING_CACHE_WRITE_BATCH):
+        await db.from_("embedding_cache").upsert(
+            rows[start:start + EMBEDDING_CACHE_WRITE_BATCH],
+            on_conflict="model,content_hash",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal,
+        ).execute()
+
+
+async def encode_cached(texts: List[str]) -> Tuple[np.ndarray, int, int]:
+    """
+    Embeds `texts`, taking vectors for already-seen texts from the cache and
+    running only the rest (each distinct text once) through the model.
+    Returns (float32 (n, dim) array, cache hits, cache misses).
+    """
+    if not EMBEDDING_CACHE or not texts:
+        return await embedding_service.encode(texts), 0, len(texts)
+
+    model = embedding_service.model_name
+    hashes = [content_hash(text) for text in texts]
+    unique: List[str] = list(dict.fromkeys(hashes))
+    try:
+        vectors = await _lookup(model, unique)
+    except Exception as e:
+        # The cache is an optimization: fall back to embedding everything.
+        print(f"--- ⚠️ Embedding cache lookup failed: {e} ---")
+        _counters["lookup_errors"] += 1
+        vectors = {}
+
+    cached: Set[str] = set(vectors)
+    missing = [h for h in unique if h not in cached]
+    if missing:
+        text_of = dict(zip(hashes, texts))
+        fresh = await embedding_service.encode([text_of[h] for h in missing])
+        new_vectors = dict(zip(missing, fresh))
+        vectors.update(new_vectors)
+        try:
+            await _store(model, new_vectors)
+        except Exception as e:
+            print(f"--- ⚠️ Embedding cache write failed: {e} ---")
+            _counters["write_errors"] += 1
+
+    hits = sum(1 for h in hashes if h in cached)
+    _counters["hits"] += hits
+    _counters["misses"] += len(hashes) - hits
+    return np.vstack([vectors[h] for h in hashes]).astype(np.float32), hits, len(hashes) - hits
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    lookups = _counters["hits"] + _counters["misses"]
+    return {**_counters, "hit_rate": round(_counters["hits"] / lookups, 3) if lookups else None}
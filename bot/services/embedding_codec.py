@@ -0,0 +1,104 @@
+# bot/services/embedding_codec.py
+import struct
+from typing import Tuple
+
+import numpy as np
+
+# Compact binary layout for stored embeddings:
+#   16-byte header: magic "AEV1", kind (u8), 3 pad bytes, dim (u32), 4 pad bytes
+#   followed by fixed-size rows, so files can be appended to and memory-mapped.
+# Row formats per kind:
+#   float32 - dim x <f4 (4 bytes/dim, exact)
+#   float16 - dim x <f2 (2 bytes/dim)
+#   int8    - one <f4 scale, then dim x i1 (1 byte/dim + 4); value = q * scale
+# JSON lists of floats, the old format, cost about 20 bytes per dimension.
+
+MAGIC = b"AEV1"
+HEADER = struct.Struct("<4sB3xI4x")
+KINDS = {"float32": 0, "float16": 1, "int8": 2}
+_KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+# Rows scored per block when the stored kind is not float32, bounding the
+# float32 scratch space a query needs.
+SCORE_BLOCK = 4096
+
+
+def row_dtype(kind: str, dim: int) -> np.dtype:
+    if kind == "float32":
+        return np.dtype(("<f4", (dim,)))
+    if kind == "float16":
+        return np.dtype(("<f2", (dim,)))
+    if kind == "int8":
+        return np.dtype([("scale", "<f4"), ("q", "i1", (dim,))])
+    raise ValueError(f"unknown embedding kind '{kind}' (use one of {', '.join(KINDS)})")
+
+
+def header(kind: str, dim: int) -> bytes:
+    return HEADER.pack(MAGIC, KINDS[kind], dim)
+
+
+def read_header(data: bytes) -> Tuple[str, int]:
+    magic, code, dim = HEADER.unpack_from(data)
+    if magic != MAGIC or code not in _KIND_NAMES:
+        raise ValueError("not an embedding blob")
+    return _KIND_NAMES[code], dim
+
+
+def quantize(matrix: np.ndarray, kind: str) -> np.ndarray:
+    """Converts a float (n, dim) matrix to rows of `kind` (see row_dtype)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    n, dim = matrix.shape
+    rows = np.empty(n, dtype=row_dtype(kind, dim))
+    if kind == "int8":
+        # Per-vector symmetric scale: the largest component maps to +/-127.
+        scale = np.abs(matrix).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        rows["scale"] = scale
+        rows["q"] = np.clip(np.rint(matrix / scale[:, None]), -127, 127)
+    else:
+        rows[:] = matrix
+    return rows
+
+
+def dequantize(rows: np.ndarray, kind: str) -> np.ndarray:
+    """The float32 (n, dim) matrix stored in `rows`."""
+    if kind == "int8":
+        return rows["q"].astype(np.float32) * rows["scale"][:, None]
+    return np.asarray(rows, dtype=np.float32)
+
+
+def encode_vectors(matrix: np.ndarray, kind: str = "float16") -> bytes:
+    """Header plus quantized rows, e.g. for storing a project's vectors as one blob."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return header(kind, matrix.shape[1]) + quantize(matrix, kind).tobytes()
+
+
+def decode_vectors(blob: bytes) -> np.ndarray:
+    kind, dim = read_header(blob)
+    rows = np.frombuffer(blob, dtype=row_dtype(kind, dim), offset=HEADER.size)
+    return dequantize(rows, kind)
+
+
+def scores(rows: np.ndarray, kind: str, query: np.ndarray) -> np.ndarray:
+    """Dot products of every stored row with a float32 `query` vector."""
+    query = np.asarray(query, dtype=np.float32)
+    if kind == "float32":
+        return np.asarray(rows, dtype=np.float32) @ query
+    out = np.empty(rows.shape[0], dtype=np.float32)
+    for start in range(0, rows.shape[0], SCORE_BLOCK):
+        block = rows[start:start + SCORE_BLOCK]
+        if kind == "int8":
+            out[start:start + len(block)] = (block["q"].astype(np.float32) @ query) * block["scale"]
+        else:
+            out[start:start + len(block)] = block.astype(np.float32) @ query
+    return out
+
+
+def vector_literal(vector: np.ndarray, kind: str = "float16") -> str:
+    """
+    pgvector text literal ("[0.0123,-0.04,...]") with only as many digits as
+    `kind` holds, so vectors cross the wire at ~8 bytes per dimension instead
+    of the ~20 a list of Python floats serializes to.
+    """
+    values = np.asarray(vector, dtype=np.float16 if kind == "float16" else np.float32).ravel()
+    return "[" + ",".join(map(str, values)) + "]"
@@ -0,0 +1,279 @@
+# bot/services/embedding_service.py
+import asyncio
+import gc
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "paraphrase-MiniLM-L3-v2")
+# Seconds without an encode call after which the model (or the worker pool)
+# is released to free memory; it is loaded again on the next call. 0 keeps it resident.
+EMBEDDING_IDLE_UNLOAD = float(os.getenv("EMBEDDING_IDLE_UNLOAD", "0"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# N > 0 runs N worker processes, each with its own copy of the model, so
+# large encodes never hold the bot's GIL; 0 opts out and encodes in a thread
+# of the bot process (one copy of the model, but uploads slow every chat).
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Texts per pool job; large uploads are split so other requests interleave.
+EMBEDDING_JOB_SIZE = int(os.getenv("EMBEDDING_JOB_SIZE", "64"))
+# Jobs admitted to the pool at once, and how long a job may wait for a slot.
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "32"))
+EMBEDDING_QUEUE_TIMEOUT = float(os.getenv("EMBEDDING_QUEUE_TIMEOUT", "60"))
+
+
+class EmbeddingBusyError(Exception):
+    """Raised when a job could not enter the embedding queue in time."""
+
+
+# --- Worker process side -------------------------------------------------
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: int) -> None:
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Keep the workers from oversubscribing the CPU between them.
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_in_worker(texts: List[str]) -> Tuple[np.ndarray, float]:
+    started = time.monotonic()
+    embeddings = _worker_model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True)
+    return np.asarray(embeddings, dtype=np.float32), time.monotonic() - started
+
+
+# --- Bot process side ----------------------------------------------------
+
+class EmbeddingService:
+    """
+    Serves encode requests from both the upload and the RAG paths with one
+    long-lived model.
+
+    With `workers` = 0 the model lives in the bot process and encodes run in
+    a worker thread. With `workers` > 0 a spawn-based process pool is used:
+    each worker loads the model once at start-up, large requests are split
+    into jobs of `job_size` texts, and at most `queue_size` jobs are admitted
+    at a time. Per-job queue wait and worker time are kept for `stats()`.
+
+    The model (or pool) is loaded on first use, or ahead of time by
+    `start_warmup()`. With `idle_unload` > 0 a background thread releases it
+    after that many idle seconds.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        idle_unload: float = 0,
+        workers: int = 0,
+        job_size: int = 64,
+        queue_size: int = 32,
+        queue_timeout: float = 60,
+    ):
+        self.model_name = model_name
+        self.idle_unload = idle_unload
+        self.workers = workers
+        self.job_size = max(1, job_size)
+        self.queue_timeout = queue_timeout
+        self._model = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._load_lock = threading.Lock()
+        self._admission = asyncio.Semaphore(queue_size)
+        self._last_used = time.monotonic()
+        self._reaper: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._pending = 0
+        self.loads = 0
+        self.unloads = 0
+        self.load_seconds = 0.0
+        self.encode_calls = 0
+        self.encoded_texts = 0
+        self.encode_seconds = 0.0
+        self.jobs = 0
+        self.rejected = 0
+        self._queue_wait_total = 0.0
+        self._worker_time_total = 0.0
+        self._recent_jobs: deque = deque(maxlen=20)
+
+    # -- in-process model --
+
+    def _get_model(self):
+        model = self._model
+        if model is not None:
+            return model
+        with self._load_lock:
+            if self._model is None:
+                # Lazy import: sentence_transformers pulls in torch.
+                from sentence_transformers import SentenceTransformer
+
+                print(f"--- 🧠 Loading embedding model {self.model_name}... ---")
+                started = time.monotonic()
+                self._model = SentenceTransformer(self.model_name)
+                elapsed = time.monotonic() - started
+                self.loads += 1
+                self.load_seconds += elapsed
+                print(f"--- 🧠 Embedding model loaded in {elapsed:.1f}s ---")
+            return self._model
+
+    def encode_sync(self, texts: List[str]) -> np.ndarray:
+        """Encodes `texts` in the calling thread. Returns a float32 (n, dim) array."""
+        self._last_used = time.monotonic()
+        model = self._get_model()
+        started = time.monotonic()
+        embeddings = model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True)
+        self.encode_calls += 1
+        self.encoded_texts += len(texts)
+        self.encode_seconds += time.monotonic() - started
+        self._last_used = time.monotonic()
+        return np.asarray(embeddings, dtype=np.float32)
+
+    # -- process pool --
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        pool = self._pool
+        if pool is not None:
+            return pool
+        with self._load_lock:
+            if self._pool is None:
+                torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, torch_threads),
+                )
+                self.loads += 1
+                print(f"--- 🧠 Started {self.workers} embedding worker process(es) ---")
+            return self._pool
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        """Runs one job on the pool, bounded by the admission queue, and records its timing."""
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise EmbeddingBusyError(f"embedding queue full for {self.queue_timeout:.0f}s")
+
+        self._pending += 1
+        self._last_used = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result, worker_seconds = await loop.run_in_executor(self._get_pool(), func, *args)
+        finally:
+            self._pending -= 1
+            self._admission.release()
+            self._last_used = time.monotonic()
+
+        total = time.monotonic() - queued_at
+        self.jobs += 1
+        self._worker_time_total += worker_seconds
+        self._queue_wait_total += max(0.0, total - worker_seconds)
+        self._recent_jobs.append({
+            "job": getattr(func, "__name__", str(func)),
+            "wait_ms": round(1000 * max(0.0, total - worker_seconds), 1),
+            "worker_ms": round(1000 * worker_seconds, 1),
+        })
+        return result
+
+    # -- public API --
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Encodes `texts` without blocking the event loop. Returns a float32 (n, dim) array."""
+        if not self.workers:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.encode_sync, texts)
+
+        started = time.monotonic()
+        jobs = [texts[i:i + self.job_size] for i in range(0, len(texts), self.job_size)]
+        parts = await asyncio.gather(*(self._submit(_encode_in_worker, job) for job in jobs))
+        self.encode_calls += 1
+        self.encoded_texts += len(texts)
+        self.encode_seconds += time.monotonic() - started
+        return np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+
+    def _warmup(self) -> None:
+        try:
+            if self.workers:
+                # Submitting one job per worker starts every process (and its model).
+                pool = self._get_pool()
+                futures = [pool.submit(_encode_in_worker, ["warmup"]) for _ in range(self.workers)]
+                for future in futures:
+                    future.result()
+                print("--- 🧠 Embedding workers warmed up ---")
+            else:
+                self.encode_sync(["warmup"])
+        except Exception as e:
+            print(f"--- ⚠️ Embedding warmup failed: {e} ---")
+
+    def start_warmup(self) -> None:
+        """Loads the model (or starts the workers) in the background; returns immediately."""
+        threading.Thread(target=self._warmup, name="embedding-warmup", daemon=True).start()
+        if self.idle_unload > 0 and self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_idle, name="embedding-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_idle(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_unload / 2))
+        while not self._stopped.wait(interval):
+            idle = time.monotonic() - self._last_used > self.idle_unload
+            if idle and not self._pending and (self._model is not None or self._pool is not None):
+                self.unload()
+
+    def unload(self) -> None:
+        with self._load_lock:
+            model, pool = self._model, self._pool
+            if model is None and pool is None:
+                return
+            self._model = None
+            self._pool = None
+            self.unloads += 1
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        gc.collect()
+        print("--- 🧠 Embedding model unloaded after being idle. ---")
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        with self._load_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "workers": self.workers,
+            "loaded": self._model is not None or self._pool is not None,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "avg_load_s": round(self.load_seconds / self.loads, 2) if self.loads and not self.workers else None,
+            "encode_calls": self.encode_calls,
+            "encoded_texts": self.encoded_texts,
+            "avg_encode_ms": round(1000 * self.encode_seconds / self.encode_calls, 1) if self.encode_calls else None,
+            "jobs": self.jobs,
+            "pending_jobs": self._pending,
+            "rejected_jobs": self.rejected,
+            "avg_queue_wait_ms": round(1000 * self._queue_wait_total / self.jobs, 1) if self.jobs else None,
+            "avg_worker_ms": round(1000 * self._worker_time_total / self.jobs, 1) if self.jobs else None,
+            "recent_jobs": list(self._recent_jobs),
+        }
+
+
+embedding_service = EmbeddingService(
+    EMBEDDING_MODEL,
+    idle_unload=EMBEDDING_IDLE_UNLOAD,
+    workers=EMBEDDING_WORKERS,
+    job_size=EMBEDDING_JOB_SIZE,
+    queue_size=EMBEDDING_QUEUE_SIZE,
+    queue_timeout=EMBEDDING_QUEUE_TIMEOUT,
+)
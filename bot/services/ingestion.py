@@ -0,0 +1,94 @@
+# bot/services/ingestion.py
+import asyncio
+import os
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from utils.file_utils import iter_text_from_file
+from services.embedding_cache import encode_cached
+from services.chunk_store import store_chunks
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# Chunks embedded and stored per batch; the first batches are searchable
+# while later pages are still being read.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# Text is split once the buffer holds this many chunks' worth of characters.
+_SPLIT_WINDOW = 4
+
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[Dict[str, Any]]:
+    """
+    Splits a stream of text pieces (pages, paragraphs) into overlapping
+    chunks of {"content", "char_start"} as the pieces arrive. Only the tail
+    of the text, from the start of the last unfinished chunk, is kept
+    between pieces, so chunks (and their overlap) run across page breaks
+    while memory stays bounded whatever the document size.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    buffer, offset = "", 0
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < _SPLIT_WINDOW * chunk_size:
+            continue
+        documents = splitter.create_documents([buffer])
+        # The last chunk may continue in the next piece: it is split again
+        # together with what follows.
+        for doc in documents[:-1]:
+            yield {"content": doc.page_content, "char_start": offset + doc.metadata["start_index"]}
+        keep = max(documents[-1].metadata["start_index"], 0) if documents else len(buffer)
+        buffer, offset = buffer[keep:], offset + keep
+
+    if buffer.strip():
+        for doc in splitter.create_documents([buffer]):
+            yield {"content": doc.page_content, "char_start": offset + doc.metadata["start_index"]}
+
+
+def _take(chunks: Iterator[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    return list(islice(chunks, count))
+
+
+async def ingest_file(
+    project_id: str,
+    file_path: str,
+    file_id: str = None,
+    skip: int = 0,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> Tuple[bool, str]:
+    """
+    Streams a file into the project's chunk store: pages are read and chunked
+    in a worker thread while the previous batch of INGEST_BATCH_SIZE chunks
+    is embedded (through the embedding cache) and stored.
+
+    Chunking is deterministic, so an interrupted run resumes by passing the
+    number of chunks already stored as `skip`. `on_progress` is awaited with
+    the running total after every stored batch. Errors propagate, so the
+    caller can retry from the last stored batch.
+    Returns a tuple: (success, message about the chunks indexed).
+    """
+    print(f"--- 🧠 Ingesting {os.path.basename(file_path)} for project {project_id} ---")
+    loop = asyncio.get_running_loop()
+    chunks = islice(iter_chunks(iter_text_from_file(file_path)), skip, None)
+    stored, hits, misses = skip, 0, 0
+    pending = loop.run_in_executor(None, _take, chunks, INGEST_BATCH_SIZE)
+    while True:
+        batch = await pending
+        if not batch:
+            break
+        # Read ahead while this batch is embedded.
+        pending = loop.run_in_executor(None, _take, chunks, INGEST_BATCH_SIZE)
+        embeddings, batch_hits, batch_misses = await encode_cached([chunk["content"] for chunk in batch])
+        stored += await store_chunks(project_id, file_id, batch, embeddings, first_index=stored)
+        hits += batch_hits
+        misses += batch_misses
+        if on_progress:
+            await on_progress(stored)
+
+    if not stored:
+        print(f"--- ⚠️ No text chunks to embed for project {project_id} ---")
+        return (False, "Could not extract text. The file might be empty, corrupted, or an unsupported format.")
+
+    print(f"--- ✅ {stored} chunks stored for project {project_id} ({hits} cache hits, {misses} misses) ---")
+    return (True, f"🧠 {stored} chunks indexed: {misses} embedded, {hits} reused from earlier uploads.")
@@ -0,0 +1,288 @@
+# bot/services/ingestion_queue.py
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from telegram import Bot
+from telegram.error import TelegramError
+from telegram.helpers import escape_markdown
+
+from utils.db import get_db
+from services.ingestion import ingest_file
+from services.chunk_store import drop_file_chunks
+from services.project_service import STORAGE_BUCKET
+from services.answer_cache import invalidate_project_answers
+
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# Seconds before a failed attempt is retried (times the attempt number).
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", "30"))
+# Minimum seconds between edits of a job's progress message while indexing.
+INGEST_PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", "3"))
+
+
+class IngestionQueue:
+    """
+    Processes uploaded files in the background, at most `concurrency` at a
+    time, so the upload handler can reply straight away.
+
+    Each job is a row of ingestion_jobs (migrations/009_ingestion_jobs.sql)
+    and runs two stages: "store" (Telegram download, storage upload and the
+    project_files row) and "index" (streamed chunking and embedding). When
+    indexing succeeds, earlier uploads of the same file name to the project
+    are removed (see `_replace_earlier`). The stage and the number of chunks
+    stored are saved as they complete, and the job's progress message is
+    edited along the way (best effort: a failed edit never fails the job).
+    `start()` picks up jobs left unfinished by a previous run; failed
+    attempts, including runs cut short by a crash, are retried up to
+    `max_attempts` times. A batch stored just before a failure is stored
+    again on retry, which the chunk store skips.
+    """
+
+    def __init__(self, concurrency: int, max_attempts: int):
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._bot: Optional[Bot] = None
+        self._last_edit: Dict[str, float] = {}
+        self._running = 0
+        self.enqueued = 0
+        self.resumed = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.replaced = 0
+
+    async def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        try:
+            db = await get_db()
+            response = await (
+                db.from_("ingestion_jobs")
+                .select("*")
+                .in_("status", ["queued", "running"])
+                .order("created_at")
+                .execute()
+            )
+            for job in response.data or []:
+                self._queue.put_nowait(job)
+                self.resumed += 1
+            if self.resumed:
+                print(f"--- 📥 Resuming {self.resumed} unfinished ingestion job(s) ---")
+        except Exception as e:
+            print(f"--- ⚠️ Could not load unfinished ingestion jobs: {e} ---")
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        # Jobs in progress stay "running" in the table and resume on the next start.
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(
+        self,
+        project_id: str,
+        chat_id: int,
+        message_id: int,
+        telegram_file_id: str,
+        file_name: str,
+        mime_type: Optional[str],
+        uploaded_by: Optional[str],
+    ) -> Dict[str, Any]:
+        """Saves a new job and queues it. `message_id` is the message to edit with progress."""
+        job = {
+            "id": str(uuid4()),
+            "project_id": project_id,
+            "file_id": str(uuid4()),
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "telegram_file_id": telegram_file_id,
+            "file_name": file_name,
+            "storage_name": f"{project_id}_{uuid4()}_{file_name}",
+            "mime_type": mime_type,
+            "uploaded_by": uploaded_by,
+            "status": "queued",
+            "stage": "store",
+            "chunks_done": 0,
+            "attempts": 0,
+        }
+        db = await get_db()
+        await db.from_("ingestion_jobs").insert(job).execute()
+        self._queue.put_nowait(job)
+        self.enqueued += 1
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            try:
+                await self._run(job)
+            except Exception as e:
+                print(f"Error in ingestion job {job['id']}: {e}")
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def _save(self, job: Dict[str, Any], **fields) -> None:
+        job.update(fields)
+        db = await get_db()
+        await db.from_("ingestion_jobs").update({
+            **fields,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", job["id"]).execute()
+
+    async def _progress(self, job: Dict[str, Any], text: str, throttle: bool = False) -> None:
+        if not job.get("message_id"):
+            return
+        now = time.monotonic()
+        if throttle and now - self._last_edit.get(job["id"], 0) < INGEST_PROGRESS_INTERVAL:
+            return
+        self._last_edit[job["id"]] = now
+        try:
+            await self._bot.edit_message_text(text, chat_id=job["chat_id"], message_id=job["message_id"], parse_mode="Markdown")
+        except TelegramError as e:
+            # The message was deleted, already shows this text, or Telegram
+            # is rate limiting or unreachable. Progress is best effort: it
+            # must never fail (and so retry) a job whose chunks are stored.
+            print(f"--- ⚠️ Could not update progress of ingestion job {job['id']}: {e} ---")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        # Progress messages are sent as Markdown; "my_file.pdf" must not break them.
+        name = escape_markdown(job["file_name"])
+        if job["attempts"] >= self.max_attempts:
+            await self._save(job, status="failed")
+            self.failed += 1
+            await self._progress(job, f"❗ Could not process *{name}*. Please try uploading it again.")
+            return
+        await self._save(job, status="running", attempts=job["attempts"] + 1)
+        temp_path = os.path.join(tempfile.gettempdir(), job["storage_name"])
+        try:
+            await self._progress(job, f"📥 Downloading *{name}*...")
+            telegram_file = await self._bot.get_file(job["telegram_file_id"])
+            await telegram_file.download_to_drive(temp_path)
+
+            if job["stage"] == "store":
+                await self._progress(job, f"☁️ Saving *{name}* to the project...")
+                await self._store(job, temp_path)
+                await self._save(job, stage="index")
+
+            await self._progress(job, f"🧠 Indexing *{name}*...")
+
+            async def on_progress(stored: int) -> None:
+                # New chunks can change answers given before this upload.
+                invalidate_project_answers(job["project_id"])
+                await self._save(job, chunks_done=stored)
+                await self._progress(job, f"🧠 Indexing *{name}*: {stored} chunks so far...", throttle=True)
+
+            indexed, note = await ingest_file(
+                job["project_id"], temp_path, file_id=job["file_id"],
+                skip=job["chunks_done"], on_progress=on_progress,
+            )
+            # The earlier upload of this file is only dropped once the new
+            # one is searchable, so a failed upload never loses both.
+            replaced = await self._replace_earlier(job) if indexed else 0
+            await self._save(job, status="done", error=None if indexed else note)
+            self.completed += 1
+            if indexed:
+                if replaced:
+                    note += f"\n♻️ Replaced the earlier upload of *{name}*."
+                await self._progress(job, f"✅ File *{name}* uploaded and linked to the project!\n{note}")
+            else:
+                await self._progress(job, f"✅ File *{name}* uploaded and linked to the project.\n⚠️ {note}")
+        except Exception as e:
+            print(f"Error ingesting {job['file_name']} (attempt {job['attempts']}): {e}")
+            if job["attempts"] < self.max_attempts:
+                await self._save(job, status="queued", error=str(e))
+                self.retries += 1
+                await self._progress(job, f"⏳ Processing *{name}* failed, retrying shortly...")
+                asyncio.get_running_loop().call_later(INGEST_RETRY_DELAY * job["attempts"], self._queue.put_nowait, job)
+            else:
+                await self._save(job, status="failed", error=str(e))
+                self.failed += 1
+                await self._progress(job, f"❗ Could not process *{name}*. Please try uploading it again.")
+        finally:
+            self._last_edit.pop(job["id"], None)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def _store(self, job: Dict[str, Any], temp_path: str) -> None:
+        """Uploads the original file and records it in project_files (both idempotent on retry)."""
+        db = await get_db()
+        with open(temp_path, "rb") as f:
+            await db.storage.from_(STORAGE_BUCKET).upload(
+                path=f"project-files/{job['storage_name']}",
+                file=f,
+                file_options={"content-type": job["mime_type"], "upsert": "true"}
+            )
+        await db.from_("project_files").upsert({
+            "id": job["file_id"],
+            "project_id": job["project_id"],
+            "filename": job["file_name"],
+            "custom_name": job["storage_name"],
+            "type": os.path.splitext(job["file_name"])[1].lower(),
+            "uploaded_by": job["uploaded_by"]
+        }).execute()
+
+    async def _replace_earlier(self, job: Dict[str, Any]) -> int:
+        """
+        Removes earlier uploads of the job's file name in its project: their
+        chunks, project_files rows and stored objects. Runs after the new
+        upload is indexed; a failure is logged and leaves the earlier upload
+        in place. Returns the number of uploads replaced.
+        """
+        try:
+            return await self._remove_earlier(job)
+        except Exception as e:
+            print(f"--- ⚠️ Could not replace earlier uploads of {job['file_name']}: {e} ---")
+            return 0
+
+    async def _remove_earlier(self, job: Dict[str, Any]) -> int:
+        db = await get_db()
+        response = await (
+            db.from_("project_files")
+            .select("id, custom_name")
+            .eq("project_id", job["project_id"])
+            .eq("filename", job["file_name"])
+            .neq("id", job["file_id"])
+            .execute()
+        )
+        earlier = response.data or []
+        if not earlier:
+            return 0
+        removed = 0
+        for row in earlier:
+            removed += await drop_file_chunks(job["project_id"], row["id"])
+        # Deleting the rows also deletes their pgvector chunks (on delete cascade).
+        await db.from_("project_files").delete().in_("id", [row["id"] for row in earlier]).execute()
+        invalidate_project_answers(job["project_id"])
+        self.replaced += len(earlier)
+        print(f"--- ♻️ Replacing {len(earlier)} earlier upload(s) of {job['file_name']} ({removed} local chunks removed) ---")
+        try:
+            await db.storage.from_(STORAGE_BUCKET).remove([f"project-files/{row['custom_name']}" for row in earlier])
+        except Exception as e:
+            print(f"--- ⚠️ Failed to remove earlier uploads of {job['file_name']} from storage: {e} ---")
+        return len(earlier)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "enqueued": self.enqueued,
+            "resumed": self.resumed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "replaced": self.replaced,
+        }
+
+
+ingestion_queue = IngestionQueue(INGEST_CONCURRENCY, INGEST_MAX_ATTEMPTS)
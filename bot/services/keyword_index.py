@@ -0,0 +1,95 @@
+# bot/services/keyword_index.py
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Sparse (keyword) side of hybrid retrieval. Dense embeddings blur exact
+# identifiers such as ticket numbers, names and dates; BM25 over chunk terms
+# finds them, and reciprocal rank fusion merges the two rankings.
+
+# Tokenizer of the local backend, used for both chunks and questions. Words
+# joined by - . / : # @ stay one token ("jira-1234", "v2.3", "2024-05-01")
+# and their parts are indexed too. The pgvector backend does not use it: its
+# questions are split on the server by the same 'simple' configuration as
+# the chunks (migrations/010_project_chunks_keywords.sql), which splits such
+# tokens differently.
+_TOKEN = re.compile(r"\w+(?:[-./:#@]\w+)*")
+_PART = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a about an and are as at be been but by can could did do does for from had has have how i if in into is it "
+    "its me my of on or our please should so that the their them then there these they this to was we were what "
+    "when where which who whom why will with would you your".split()
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased keyword tokens of `text`, stopwords removed."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _PART.findall(token) if part != token and part not in STOPWORDS)
+    return tokens
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    return dict(Counter(tokenize(text)))
+
+
+class BM25Index:
+    """
+    In-memory inverted index over a fixed list of documents, each given as
+    its term counts. Postings are numpy arrays, so a query costs one pass
+    over the postings of its own terms.
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, int]]):
+        rows: Dict[str, List[int]] = {}
+        freqs: Dict[str, List[int]] = {}
+        lengths = []
+        for row, terms in enumerate(documents):
+            lengths.append(sum(terms.values()))
+            for term, count in terms.items():
+                rows.setdefault(term, []).append(row)
+                freqs.setdefault(term, []).append(count)
+        self.count = len(lengths)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if self.count and self.lengths.sum() else 1.0
+        self.postings = {
+            term: (np.asarray(rows[term], dtype=np.int64), np.asarray(freqs[term], dtype=np.float32))
+            for term in rows
+        }
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Best k (row, score) pairs for the query's terms, best first."""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+        if not terms or k <= 0:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in terms:
+            rows, tf = self.postings[term]
+            idf = math.log(1 + (self.count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[rows] / self.avg_length)
+            scores[rows] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        matched = np.flatnonzero(scores)
+        k = min(k, len(matched))
+        best = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        best = best[np.argsort(-scores[best])]
+        return [(int(row), float(scores[row])) for row in best]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Merges rankings (lists of ids, best first) by summing 1 / (k + rank)."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
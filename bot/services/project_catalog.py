@@ -0,0 +1,101 @@
+# bot/services/project_catalog.py
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.cache import TTLCache
+from utils.db import get_db
+
+# Per-group name -> project resolution. Project creation and deletion in the
+# bot invalidate the group's catalog; projects created elsewhere are picked up
+# on the next miss (at most once per PROJECT_CATALOG_MISS_REFRESH seconds) or
+# when the catalog expires.
+PROJECT_CATALOG_TTL = int(os.getenv("PROJECT_CATALOG_TTL", "600"))
+PROJECT_CATALOG_GROUPS = int(os.getenv("PROJECT_CATALOG_GROUPS", "500"))
+PROJECT_CATALOG_MISS_REFRESH = float(os.getenv("PROJECT_CATALOG_MISS_REFRESH", "30"))
+
+# raw_input can be large, so it is deliberately not part of the catalog.
+CATALOG_COLUMNS = "id, name, description, owner_id, group_id, created_at"
+
+
+class ProjectCatalog:
+    """The projects of one group, indexed by ID and by case-insensitive name."""
+
+    def __init__(self, projects: List[Dict[str, Any]]):
+        self.loaded_at = time.monotonic()
+        self.projects = projects
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.by_lower_name: Dict[str, Dict[str, Any]] = {}
+        for project in projects:
+            self.by_id[project["id"]] = project
+            self.by_name[project["name"]] = project
+            self.by_lower_name.setdefault(project["name"].lower(), project)
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """An exact-case match wins; otherwise the name is matched case-insensitively."""
+        name = (name or "").strip()
+        return self.by_name.get(name) or self.by_lower_name.get(name.lower())
+
+
+_catalogs = TTLCache(maxsize=PROJECT_CATALOG_GROUPS, ttl=PROJECT_CATALOG_TTL)  # group_id -> ProjectCatalog
+_load_locks: Dict[int, asyncio.Lock] = {}
+
+
+async def _load_catalog(group_id: int, refresh: bool = False) -> ProjectCatalog:
+    if not refresh:
+        catalog = _catalogs.get(group_id)
+        if catalog is not None:
+            return catalog
+
+    lock = _load_locks.setdefault(group_id, asyncio.Lock())
+    async with lock:
+        catalog = _catalogs.peek(group_id)
+        # Another caller may have (re)loaded the catalog while we waited.
+        if catalog is not None and (not refresh or time.monotonic() - catalog.loaded_at < PROJECT_CATALOG_MISS_REFRESH):
+            return catalog
+
+        db = await get_db()
+        started = time.monotonic()
+        response = await db.from_("projects").select(CATALOG_COLUMNS).eq("group_id", group_id).order("created_at").execute()
+        catalog = ProjectCatalog(response.data or [])
+        _catalogs.observe_load(time.monotonic() - started)
+        _catalogs.set(group_id, catalog)
+        return catalog
+
+
+async def get_project_by_name(group_id: int, name: str) -> Optional[Dict[str, Any]]:
+    """Resolves a project name within a group, or returns None if there is no such project."""
+    if not name:
+        return None
+    catalog = await _load_catalog(group_id)
+    project = catalog.find(name)
+    if project is None and time.monotonic() - catalog.loaded_at >= PROJECT_CATALOG_MISS_REFRESH:
+        catalog = await _load_catalog(group_id, refresh=True)
+        project = catalog.find(name)
+    return project
+
+
+async def get_project_by_id(group_id: int, project_id: str) -> Optional[Dict[str, Any]]:
+    """Looks up a project of the group by its ID."""
+    catalog = await _load_catalog(group_id)
+    project = catalog.by_id.get(project_id)
+    if project is None and time.monotonic() - catalog.loaded_at >= PROJECT_CATALOG_MISS_REFRESH:
+        catalog = await _load_catalog(group_id, refresh=True)
+        project = catalog.by_id.get(project_id)
+    return project
+
+
+async def list_projects(group_id: int) -> List[Dict[str, Any]]:
+    """Every project of the group, oldest first."""
+    return (await _load_catalog(group_id)).projects
+
+
+def invalidate_project_catalog(group_id: Optional[int]) -> None:
+    if group_id:
+        _catalogs.invalidate(group_id)
+
+
+def project_catalog_stats() -> Dict[str, Any]:
+    return _catalogs.stats()
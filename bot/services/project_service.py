@@ -1,90 +1,58 @@
 from typing import Tuple, Dict, Any, List
-from utils.supabaseClient import supabase
+import os
+from utils.db import get_db
 from utils.auth_helper import get_user_from_telegram, check_admin_permission
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from utils.user_directory import get_username
+from services.project_catalog import get_project_by_name, invalidate_project_catalog
+from services.task_index import invalidate_group_index
+from services.embedding_service import embedding_service
+from services.chunk_store import match_chunks, drop_chunks
+from services.answer_cache import get_cached_answer, cache_answer, answer_generation, invalidate_project_answers
 import litellm
 from utils.ai_client import get_model_name
-import json
-import gc # Import the garbage collector
 
-# NOTE: All heavy libraries are now imported inside the functions that use them.
+# NOTE: The embedding model lives in services/embedding_service.py, uploads
+# are chunked and embedded by services/ingestion.py, and the chunks and their
+# vectors are kept in services/chunk_store.py.
 
-def _embed_and_store_file_content(project_id: str, file_content: str) -> bool:
-    """
-    Generates embeddings for file content. The model is loaded on-demand.
-    """
-    embeddings_model = None
-    try:
-        # Lazy import of all heavy ML libraries
-        from sentence_transformers import SentenceTransformer
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-        import numpy as np
-        
-        print("--- 🧠 Loading embedding model for file upload... ---")
-        embeddings_model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
+STORAGE_BUCKET = "project-file-storage"
+# Storage objects are removed in batches of this many paths per request.
+STORAGE_REMOVE_BATCH = int(os.getenv("STORAGE_REMOVE_BATCH", "100"))
 
-        print(f"--- 🧠 Generating embeddings for project {project_id} ---")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_text(file_content)
 
-        if not chunks:
-            print(f"--- ⚠️ No text chunks to embed for project {project_id} ---")
-            return False
-
-        embeddings = embeddings_model.encode(chunks)
-        chunk_data = [{"content": chunk, "embedding": embeddings[i].tolist()} for i, chunk in enumerate(chunks)]
-        raw_input = json.dumps(chunk_data)
-
-        response = supabase.from_("projects").update({"raw_input": raw_input}).eq("id", project_id).execute()
-
-        if response.data:
-            print(f"--- ✅ Chunks and embeddings stored for project {project_id} ---")
-            return True
-        else:
-            print(f"--- ❌ Failed to store chunks/embeddings. Response: {response.error} ---")
-            return False
-    except Exception as e:
-        print(f"Error in _embed_and_store_file_content: {e}")
-        return False
-    finally:
-        # Crucially, unload the model and clean up memory
-        if embeddings_model:
-            del embeddings_model
-            gc.collect()
-            print("--- 🧠 File embedding model unloaded and memory freed. ---")
+def _format_bytes(size: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
 
 async def _answer_project_question_service(project_name: str, question: str, group_id: int) -> Tuple[bool, str]:
     """
-    Answers a question using RAG. The model is loaded on-demand.
+    Answers a question using RAG: the question is embedded with the shared
+    embedding service and only the project's top matching chunks (by
+    embedding similarity and keywords) are fetched. Repeated questions are
+    answered from services/answer_cache.py.
     """
-    embeddings_model = None
     try:
-        # Lazy import of all heavy ML libraries
-        from sentence_transformers import SentenceTransformer
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
+        project = await get_project_by_name(group_id, project_name)
+        if not project:
+            return (False, f"Could not find the project '{project_name}' or it has no files attached.")
 
-        print("--- 🧠 Loading embedding model for RAG... ---")
-        embeddings_model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
+        question_embedding = await embedding_service.encode([question])
+        cached = get_cached_answer(project["id"], question, question_embedding[0])
+        if cached is not None:
+            return (True, cached)
 
-        project_res = supabase.from_("projects").select("raw_input").eq("name", project_name).eq("group_id", group_id).single().execute()
+        # Read before retrieval: an upload landing while the answer is built makes it stale.
+        generation = answer_generation(project["id"])
+        matches = await match_chunks(project["id"], question_embedding[0], query_text=question)
 
-        if not project_res.data or not project_res.data.get("raw_input"):
+        if not matches:
             return (False, f"Could not find the project '{project_name}' or it has no files attached.")
 
-        chunk_data = json.loads(project_res.data["raw_input"])
-        question_embedding = embeddings_model.encode([question])
-        chunk_embeddings = np.array([chunk['embedding'] for chunk in chunk_data])
-        similarities = cosine_similarity(question_embedding, chunk_embeddings)[0]
-
-        top_n = 5
-        top_indices = np.argsort(similarities)[-top_n:][::-1]
         context = "Relevant information from project documents:\n"
-        for i in top_indices:
-            context += f"- {chunk_data[i]['content']}\n"
+        for match in matches:
+            context += f"- {match['content']}\n"
 
         response = await litellm.acompletion(
             model=get_model_name(),
@@ -93,18 +61,14 @@ async def _answer_project_question_service(project_name: str, question: str, gro
                 {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
             ]
         )
-        return (True, response.choices[0].message.content)
+        answer = response.choices[0].message.content
+        cache_answer(project["id"], question, question_embedding[0], answer, generation)
+        return (True, answer)
     except Exception as e:
         print(f"Error in _answer_project_question_service: {e}")
         return (False, "An error occurred while trying to answer your question.")
-    finally:
-        # Crucially, unload the model and clean up memory
-        if embeddings_model:
-            del embeddings_model
-            gc.collect()
-            print("--- 🧠 RAG embedding model unloaded and memory freed. ---")
-
-def _create_project_service(
+
+async def _create_project_service(
     telegram_user_id: int,
     group_id: int,
     name: str,
@@ -116,17 +80,17 @@ def _create_project_service(
     Returns a tuple: (success, message).
     """
     try:
+        db = await get_db()
         # 1. Permission checks
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, "❗ You are not linked yet. Use /link first.")
         
-        if not check_admin_permission(user_data["id"], group_id):
+        if not await check_admin_permission(user_data["id"], group_id):
             return (False, "❌ Only admins can create projects.")
 
         # 2. Check if project with the same name already exists
-        existing = supabase.from_("projects").select("id").eq("group_id", group_id).eq("name", name).execute()
-        if existing.data:
+        if await get_project_by_name(group_id, name):
             return (False, f"⚠️ A project with the name **{name}** already exists in this group.")
 
         # 3. Insert the new project
@@ -137,10 +101,11 @@ def _create_project_service(
             "group_id": group_id,
             "raw_input": raw_input
         }
-        result = supabase.from_("projects").insert(insert_data).execute()
+        result = await db.from_("projects").insert(insert_data).execute()
 
         if not result.data:
             return (False, "❗ Failed to create project in the database.")
+        invalidate_project_catalog(group_id)
 
         return (True, f"✅ Project **{name}** created successfully!")
 
@@ -149,7 +114,7 @@ def _create_project_service(
         return (False, "❗ An unexpected error occurred while creating the project.")
 
 
-def _project_details_service(
+async def _project_details_service(
     telegram_user_id: int,
     group_id: int,
     project_name: str
@@ -159,12 +124,13 @@ def _project_details_service(
     Returns a tuple: (success, message).
     """
     try:
+        db = await get_db()
         # 1. Permission check (user must be linked)
-        if not get_user_from_telegram(telegram_user_id):
+        if not await get_user_from_telegram(telegram_user_id):
             return (False, "❗ You are not linked yet. Use /link first.")
 
         # 2. Fetch the project from the database
-        response = supabase.from_("projects").select("*")\
+        response = await db.from_("projects").select("*")\
             .eq("name", project_name).eq("group_id", group_id).single().execute()
 
         if not response.data:
@@ -175,10 +141,9 @@ def _project_details_service(
         owner_username = f"`{owner_id}`" # Default to showing the ID
 
         # 3. Fetch the owner's username
-        if owner_id:
-            user_res = supabase.from_("telegram_users").select("telegram_username").eq("id", owner_id).single().execute()
-            if user_res.data and user_res.data.get("telegram_username"):
-                owner_username = f"@{user_res.data['telegram_username']}"
+        owner_telegram_username = await get_username(owner_id)
+        if owner_telegram_username:
+            owner_username = f"@{owner_telegram_username}"
 
         # 4. Format the details into a message
         message = (
@@ -196,7 +161,7 @@ def _project_details_service(
         print(f"Error in _project_details_service: {e}")
         return (False, "❗ An unexpected error occurred while fetching project details.")
 
-def _project_files_service(
+async def _project_files_service(
     telegram_user_id: int,
     group_id: int,
     project_name: str
@@ -209,19 +174,19 @@ def _project_files_service(
     """
     try:
         # 1. Check if the user is linked
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, {"error_message": "❗ Please link your Telegram account using /link."})
 
         # 2. Find the specified project in the group
-        project_res = supabase.from_("projects").select("id").eq("name", project_name).eq("group_id", group_id).single().execute()
+        project = await get_project_by_name(group_id, project_name)
 
-        if not project_res.data:
+        if not project:
             return (False, {"error_message": f"❌ No project found with name: **{project_name}**"})
 
         # 3. Return the necessary IDs for the handler to set the state
         result_data = {
-            "project_id": project_res.data["id"],
+            "project_id": project["id"],
             "user_id": user_data["id"]
         }
         return (True, result_data)
@@ -231,7 +196,7 @@ def _project_files_service(
         return (False, {"error_message": "❗ An unexpected error occurred."})
     
     
-def _get_files_service(
+async def _get_files_service(
     telegram_user_id: int,
     group_id: int,
     project_name: str
@@ -242,21 +207,22 @@ def _get_files_service(
     The file_info dictionary contains everything needed to download and send a file.
     """
     try:
+        db = await get_db()
         # 1. Permission check (user must be linked)
-        if not get_user_from_telegram(telegram_user_id):
+        if not await get_user_from_telegram(telegram_user_id):
             return (False, [], "User not linked.")
 
         # 2. Find the project
-        project_resp = supabase.from_("projects").select("id, name").eq("name", project_name).eq("group_id", group_id).single().execute()
-        if not project_resp.data:
+        project = await get_project_by_name(group_id, project_name)
+        if not project:
             return (False, [], f"❗ No project found with name **{project_name}**")
         
-        project_id = project_resp.data["id"]
-        actual_project_name = project_resp.data["name"]
+        project_id = project["id"]
+        actual_project_name = project["name"]
 
         # 3. Get file metadata.
-        files_resp = (
-            supabase.from_("project_files")
+        files_resp = await (
+            db.from_("project_files")
             .select("*")
             .eq("project_id", project_id)
             .execute()
@@ -269,4 +235,74 @@ def _get_files_service(
 
     except Exception as e:
         print(f"Error in _get_files_service: {e}")
-        return (False, [], "❗ An unexpected error occurred.")
\ No newline at end of file
+        return (False, [], "❗ An unexpected error occurred.")
+
+
+async def _delete_project_service(
+    telegram_user_id: int,
+    project_id: str,
+    group_id: int
+) -> Tuple[bool, str]:
+    """
+    Deletes a project of the group (admins only) and everything attached to it: its tasks and their
+    status_logs, its project_files rows (in one transaction, see
+    migrations/005_delete_project_cascade.sql) and its files in storage
+    (batched remove calls). Reports how much was reclaimed.
+    Returns a tuple: (success, message).
+    """
+    try:
+        db = await get_db()
+        # 1. Permission check (user must be linked and an admin of this group)
+        if group_id is None:
+            return (False, "❗ This command must be used inside a group.")
+
+        user_data = await get_user_from_telegram(telegram_user_id)
+        if not user_data:
+            return (False, "❌ Please link your Telegram account first using /link")
+
+        if not await check_admin_permission(user_data["id"], group_id):
+            return (False, "❌ Only admins can delete projects.")
+
+        # 2. Delete the project and its dependent rows in one transaction
+        result = await db.rpc("delete_project_cascade", {
+            "p_project_id": project_id,
+            "p_group_id": group_id
+        }).execute()
+
+        if not result.data:
+            return (False, "❌ No project found with that ID in this group.")
+
+        deleted = result.data[0]
+        invalidate_group_index(deleted["project_group_id"])
+        invalidate_project_catalog(deleted["project_group_id"])
+        await drop_chunks(project_id)
+        invalidate_project_answers(project_id)
+
+        # 3. Remove the stored files in batches
+        paths = deleted.get("storage_paths") or []
+        removed = 0
+        bucket = db.storage.from_(STORAGE_BUCKET)
+        for start in range(0, len(paths), STORAGE_REMOVE_BATCH):
+            batch = paths[start:start + STORAGE_REMOVE_BATCH]
+            try:
+                removed += len(await bucket.remove(batch) or [])
+            except Exception as e:
+                print(f"--- ⚠️ Failed to remove {len(batch)} storage objects for project {project_id}: {e} ---")
+
+        # 4. Report what was reclaimed
+        rows = deleted["tasks_deleted"] + deleted["logs_deleted"] + deleted["files_deleted"] + 1
+        message = (
+            f"🗑️ Project **{deleted['project_name']}** deleted.\n\n"
+            f"📋 Tasks: {deleted['tasks_deleted']}\n"
+            f"🕒 History entries: {deleted['logs_deleted']}\n"
+            f"📎 File records: {deleted['files_deleted']}\n"
+            f"🗄️ Stored files removed: {removed} of {len(paths)} ({_format_bytes(deleted['storage_bytes'] or 0)})\n\n"
+            f"♻️ Reclaimed {rows} rows."
+        )
+        if removed < len(paths):
+            message += "\n⚠️ Some stored files could not be removed; see the logs."
+        return (True, message)
+
+    except Exception as e:
+        print(f"Error in _delete_project_service: {e}")
+        return (False, "❗ Something went wrong while deleting the project.")
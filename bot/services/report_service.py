@@ -1,11 +1,77 @@
 # bot/services/report_service.py
 
-from utils.supabaseClient import supabase
+from utils.db import get_db
 from utils.auth_helper import get_user_from_telegram, check_admin_permission
-from typing import Tuple
+from utils.user_directory import resolve_usernames
+from services.project_catalog import get_project_by_name, list_projects
+from typing import Tuple, List, Dict, Any
 from datetime import datetime, timedelta
 
-def _summary_service(
+
+def _format_summary(project_name: str, days: int, tasks: List[Dict[str, Any]], user_id_map: Dict[str, str]) -> str:
+    """
+    Builds the summary message for one project from its tasks in the window.
+    `user_id_map` maps assignee IDs to Telegram usernames.
+    """
+    if not tasks:
+        return f"📊 No tasks found in the last {days} days for {project_name}."
+
+    # 1. Categorize tasks
+    today = datetime.now().date()
+    in_progress_tasks = [task for task in tasks if task['status'] == 'In Progress']
+    completed_tasks = [task for task in tasks if task['status'] == 'Completed']
+    missed_deadlines = [task for task in tasks if task.get('deadline') and datetime.strptime(task['deadline'], "%Y-%m-%d").date() < today and task['status'] != 'Completed']
+
+    # 2. Sort completed tasks by completion date (newest first)
+    completed_tasks.sort(key=lambda t: t.get('updated_at') or "", reverse=True)
+
+    # 3. Helper function to format task lines
+    def format_task_line(task):
+        user_info = ""
+        if task.get('assigned_to'):
+            username = user_id_map.get(task['assigned_to']) or 'unknown'
+            user_info = f" (@{username})"
+
+        deadline_info = ""
+        if task.get('deadline'):
+            deadline_info = f" (Due: {task['deadline']})"
+
+        return f"   • {task['title']}{user_info}{deadline_info}\n"
+
+    # 4. Build the summary message
+    project_title = f"for Project '{project_name}'" if project_name else ""
+    message = f"📊 **Project Summary {project_title} (Last {days} Days)**\n\n"
+
+    # In Progress Tasks
+    message += f"🚀 **In Progress ({len(in_progress_tasks)})**\n"
+    if in_progress_tasks:
+        for task in in_progress_tasks:
+            message += format_task_line(task)
+    else:
+        message += "   No tasks in progress.\n"
+    message += "\n"
+
+    # Recently Completed Tasks
+    message += f"✅ **Recently Completed ({len(completed_tasks)})**\n"
+    if completed_tasks:
+        for task in completed_tasks[:3]: # Show the latest 3
+            message += format_task_line(task)
+    else:
+        message += "   No tasks completed recently.\n"
+    message += "\n"
+
+    # Missed Deadlines
+    message += f"⚠️ **Missed Deadlines ({len(missed_deadlines)})**\n"
+    if missed_deadlines:
+        for task in missed_deadlines:
+            message += format_task_line(task)
+    else:
+        message += "   No missed deadlines.\n"
+
+    return message
+
+
+async def _summary_service(
     telegram_user_id: int,
     group_id: int,
     project_name: str = None,
@@ -16,107 +82,100 @@ def _summary_service(
     Returns a tuple: (success, message).
     """
     try:
+        db = await get_db()
         # 1. Permission checks
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, "❌ User not linked. Please use /link first.")
 
-        if not check_admin_permission(user_data["id"], group_id):
+        if not await check_admin_permission(user_data["id"], group_id):
             return (False, "❌ Sorry, only admins can request a summary.")
 
         # 2. Fetch project ID if project_name is provided
         project_id = None
         if project_name:
-            project_res = supabase.from_("projects").select("id").eq("name", project_name).eq("group_id", group_id).single().execute()
-            if not project_res.data:
+            project = await get_project_by_name(group_id, project_name)
+            if not project:
                 return (False, f"❌ Project '{project_name}' not found.")
-            project_id = project_res.data['id']
+            project_id = project['id']
+            project_name = project['name']
 
         # 3. Fetch tasks
         date_threshold = datetime.now() - timedelta(days=days)
-        
-        query = supabase.from_("tasks").select("*").eq("group_id", group_id).gte("created_at", date_threshold)
-        
+
+        query = db.from_("tasks").select("*").eq("group_id", group_id).gte("created_at", date_threshold)
+
         if project_id:
             query = query.eq("project_id", project_id)
 
-        tasks_res = query.execute()
+        tasks_res = await query.execute()
+        tasks = tasks_res.data or []
 
-        if not tasks_res.data:
-            return (True, f"📊 No tasks found in the last {days} days for {project_name}.")
+        # 4. Fetch user details for assigned tasks (one query for all assignees)
+        user_id_map = await resolve_usernames(task.get('assigned_to') for task in tasks)
 
-        tasks = tasks_res.data
-
-        # 4. Fetch user details for assigned tasks
-        user_id_map = {}
-        for task in tasks:
-            if task.get('assigned_to'):
-                user_id = task['assigned_to']
-                if user_id not in user_id_map:
-                    user_res = supabase.from_("telegram_users").select("telegram_username").eq("id", user_id).single().execute()
-                    if user_res.data:
-                        user_id_map[user_id] = user_res.data.get('telegram_username', 'unknown')
-
-        # 5. Categorize tasks
-        in_progress_tasks = [task for task in tasks if task['status'] == 'In Progress']
-        completed_tasks = [task for task in tasks if task['status'] == 'Completed']
-        missed_deadlines = [task for task in tasks if task.get('deadline') and datetime.strptime(task['deadline'], "%Y-%m-%d").date() < datetime.now().date() and task['status'] != 'Completed']
-
-        # 6. Sort completed tasks by completion date (newest first)
-        completed_tasks.sort(key=lambda t: t.get('updated_at'), reverse=True)
-
-        # 7. Helper function to format task lines
-        def format_task_line(task):
-            user_info = ""
-            if task.get('assigned_to'):
-                username = user_id_map.get(task['assigned_to'], 'unknown')
-                user_info = f" (@{username})"
-            
-            deadline_info = ""
-            if task.get('deadline'):
-                deadline_info = f" (Due: {task['deadline']})"
-
-            return f"   • {task['title']}{user_info}{deadline_info}\n"
-
-        # 8. Build the summary message
-        project_title = f"for Project '{project_name}'" if project_name else ""
-        message = f"📊 **Project Summary {project_title} (Last {days} Days)**\n\n"
-
-        # In Progress Tasks
-        message += f"🚀 **In Progress ({len(in_progress_tasks)})**\n"
-        if in_progress_tasks:
-            for task in in_progress_tasks:
-                message += format_task_line(task)
-        else:
-            message += "   No tasks in progress.\n"
-        message += "\n"
-
-        # Recently Completed Tasks
-        message += f"✅ **Recently Completed ({len(completed_tasks)})**\n"
-        if completed_tasks:
-            for task in completed_tasks[:3]: # Show the latest 3
-                message += format_task_line(task)
-        else:
-            message += "   No tasks completed recently.\n"
-        message += "\n"
-        
-        # Missed Deadlines
-        message += f"⚠️ **Missed Deadlines ({len(missed_deadlines)})**\n"
-        if missed_deadlines:
-            for task in missed_deadlines:
-                message += format_task_line(task)
-        else:
-            message += "   No missed deadlines.\n"
-
-        return (True, message)
+        # 5. Build the summary message
+        return (True, _format_summary(project_name, days, tasks, user_id_map))
 
     except Exception as e:
         print(f"Error in _summary_service: {e}")
         return (False, "❗ An unexpected error occurred while generating the summary.")
 
 
+async def _group_summary_service(
+    telegram_user_id: int,
+    group_id: int,
+    days: int = 7
+) -> Tuple[bool, List[str]]:
+    """
+    Generates the summary of every project in a group from a single pass
+    over the group's tasks in the window: one auth check, one projects query,
+    one tasks query and one username lookup, whatever the number of projects.
+    Returns a tuple: (success, list_of_messages), one message per project.
+    """
+    try:
+        db = await get_db()
+        # 1. Permission checks (once for the whole group)
+        user_data = await get_user_from_telegram(telegram_user_id)
+        if not user_data:
+            return (False, ["❌ User not linked. Please use /link first."])
+
+        if not await check_admin_permission(user_data["id"], group_id):
+            return (False, ["❌ Sorry, only admins can request a summary."])
 
+        # 2. Get all projects of the group from the catalog
+        projects = await list_projects(group_id)
+        if not projects:
+            return (True, [])
 
+        # 3. Fetch every task in the window once
+        date_threshold = datetime.now() - timedelta(days=days)
+        tasks_res = await (
+            db.from_("tasks")
+            .select("*")
+            .eq("group_id", group_id)
+            .gte("created_at", date_threshold)
+            .execute()
+        )
+        tasks = tasks_res.data or []
+
+        # 4. Bucket tasks by project in one pass
+        tasks_by_project: Dict[str, List[Dict[str, Any]]] = {project["id"]: [] for project in projects}
+        for task in tasks:
+            bucket = tasks_by_project.get(task.get("project_id"))
+            if bucket is not None:
+                bucket.append(task)
 
+        # 5. Resolve every assignee in the window with one lookup
+        user_id_map = await resolve_usernames(task.get('assigned_to') for task in tasks)
 
+        # 6. Build one section per project
+        messages = [
+            _format_summary(project["name"], days, tasks_by_project[project["id"]], user_id_map)
+            for project in projects
+        ]
+        return (True, messages)
 
+    except Exception as e:
+        print(f"Error in _group_summary_service: {e}")
+        return (False, ["❗ An unexpected error occurred while generating the summary."])
@@ -0,0 +1,212 @@
+# bot/services/task_index.py
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from utils.cache import TTLCache
+from utils.db import get_db
+
+# Per-group indexes are rebuilt after TASK_INDEX_TTL seconds so writes made
+# outside the bot (e.g. the web app) are eventually picked up.
+TASK_INDEX_TTL = int(os.getenv("TASK_INDEX_TTL", "600"))
+TASK_INDEX_GROUPS = int(os.getenv("TASK_INDEX_GROUPS", "200"))
+FUZZY_THRESHOLD = float(os.getenv("TASK_FUZZY_THRESHOLD", "0.3"))
+
+INDEX_COLUMNS = "id, title, status, assigned_to, deadline, created_at, project_id, group_id, projects(name)"
+PAGE_SIZE = 1000
+
+
+class TaskMatch(NamedTuple):
+    task: Dict[str, Any]
+    score: float
+    exact: bool  # True when the query is a case-insensitive substring of the title
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _grams(text: str, padded: bool = True) -> Set[str]:
+    """Character trigrams of a normalized string, padded like pg_trgm by default."""
+    if padded:
+        text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class GroupTaskIndex:
+    """
+    In-memory trigram index over one group's task titles.
+
+    Substring matches (the bot's historical matching rule) are found by
+    intersecting the posting lists of the query's trigrams; everything else
+    sharing enough trigrams is returned as a fuzzy match, ranked by trigram
+    similarity.
+    """
+
+    def __init__(self, tasks: Iterable[Dict[str, Any]] = ()):
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._titles: Dict[str, str] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        for task in tasks:
+            self.upsert(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def upsert(self, task: Dict[str, Any]) -> None:
+        task_id = task["id"]
+        title = _normalize(task.get("title", ""))
+        if self._titles.get(task_id) != title:
+            self._unindex(task_id)
+            grams = _grams(title)
+            self._titles[task_id] = title
+            self._grams[task_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(task_id)
+        self._tasks[task_id] = {**self._tasks.get(task_id, {}), **task}
+
+    def remove(self, task_id: str) -> None:
+        self._unindex(task_id)
+        self._tasks.pop(task_id, None)
+
+    def _unindex(self, task_id: str) -> None:
+        for gram in self._grams.pop(task_id, ()):
+            ids = self._postings.get(gram)
+            if ids:
+                ids.discard(task_id)
+                if not ids:
+                    del self._postings[gram]
+        self._titles.pop(task_id, None)
+
+    def search(
+        self,
+        query: str,
+        statuses: Optional[Iterable[str]] = None,
+        assigned_to: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[TaskMatch]:
+        """
+        Returns substring matches ranked by trigram similarity. Only when there
+        are none does it fall back to fuzzy matches above FUZZY_THRESHOLD.
+        """
+        q = _normalize(query)
+        if not q:
+            return []
+        status_set = set(statuses) if statuses else None
+        query_grams = _grams(q)
+
+        def allowed(task_id: str) -> bool:
+            task = self._tasks[task_id]
+            if status_set is not None and task.get("status") not in status_set:
+                return False
+            return assigned_to is None or task.get("assigned_to") == assigned_to
+
+        def similarity(task_id: str, common: int) -> float:
+            return common / (len(query_grams) + len(self._grams[task_id]) - common)
+
+        # Substring candidates must contain every (unpadded) trigram of the query.
+        if len(q) >= 3:
+            posting_lists = sorted((self._postings.get(g, set()) for g in _grams(q, padded=False)), key=len)
+            candidates = set(posting_lists[0]).intersection(*posting_lists[1:])
+        else:
+            candidates = set(self._tasks)
+
+        matches = []
+        for task_id in candidates:
+            if allowed(task_id) and q in self._titles[task_id]:
+                common = len(query_grams & self._grams[task_id])
+                matches.append(TaskMatch(self._tasks[task_id], 1.0 + similarity(task_id, common), True))
+
+        if not matches:
+            shared = Counter()
+            for gram in query_grams:
+                for task_id in self._postings.get(gram, ()):
+                    shared[task_id] += 1
+            for task_id, common in shared.items():
+                score = similarity(task_id, common)
+                if score >= FUZZY_THRESHOLD and allowed(task_id):
+                    matches.append(TaskMatch(self._tasks[task_id], score, False))
+
+        matches.sort(key=lambda m: (m.score, m.task.get("created_at") or ""), reverse=True)
+        return matches[:limit] if limit else matches
+
+
+_indexes = TTLCache(maxsize=TASK_INDEX_GROUPS, ttl=TASK_INDEX_TTL)  # group_id -> GroupTaskIndex
+_build_locks: Dict[int, asyncio.Lock] = {}
+
+
+async def _load_group_index(group_id: int) -> GroupTaskIndex:
+    index = _indexes.get(group_id)
+    if index is not None:
+        return index
+
+    lock = _build_locks.setdefault(group_id, asyncio.Lock())
+    async with lock:
+        index = _indexes.get(group_id)
+        if index is not None:
+            return index
+
+        db = await get_db()
+        started = time.monotonic()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page = await (
+                db.from_("tasks")
+                .select(INDEX_COLUMNS)
+                .eq("group_id", group_id)
+                .order("created_at")
+                .range(len(rows), len(rows) + PAGE_SIZE - 1)
+                .execute()
+            )
+            rows.extend(page.data or [])
+            if not page.data or len(page.data) < PAGE_SIZE:
+                break
+
+        index = GroupTaskIndex(rows)
+        _indexes.observe_load(time.monotonic() - started)
+        _indexes.set(group_id, index)
+        print(f"--- 🗂️ Built task index for group {group_id} ({len(index)} tasks) ---")
+        return index
+
+
+async def search_group_tasks(
+    group_id: int,
+    query: str,
+    statuses: Optional[Iterable[str]] = None,
+    assigned_to: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[TaskMatch]:
+    """Searches a group's task titles, building the group's index on first use."""
+    index = await _load_group_index(group_id)
+    return index.search(query, statuses=statuses, assigned_to=assigned_to, limit=limit)
+
+
+def rank_tasks(tasks: Iterable[Dict[str, Any]], query: str) -> List[TaskMatch]:
+    """Applies the same matching and ranking to an ad-hoc list of task rows."""
+    return GroupTaskIndex(tasks).search(query)
+
+
+def record_task(task: Dict[str, Any]) -> None:
+    """Applies a task insert/update to its group's index, if that index is loaded."""
+    group_id = task.get("group_id")
+    index = _indexes.peek(group_id) if group_id else None
+    if index is not None:
+        index.upsert(task)
+
+
+def forget_task(group_id: Optional[int], task_id: str) -> None:
+    """Removes a deleted task from the group's index, if it is loaded."""
+    index = _indexes.peek(group_id) if group_id else None
+    if index is not None:
+        index.remove(task_id)
+
+
+def invalidate_group_index(group_id: int) -> None:
+    _indexes.invalidate(group_id)
+
+
+def task_index_stats() -> Dict[str, Any]:
+    return _indexes.stats()
@@ -0,0 +1,76 @@
+# bot/services/task_search.py
+import os
+from typing import Iterable, List, Optional
+
+from utils.db import get_db
+from services.task_index import TaskMatch, search_group_tasks, rank_tasks
+
+# "rpc" searches server-side with the search_tasks function from
+# migrations/001_task_title_search.sql; "memory" uses the per-group
+# in-process index. If the RPC fails (e.g. the migration has not been
+# applied yet) the in-memory index is used for that call.
+TASK_SEARCH_BACKEND = os.getenv("TASK_SEARCH_BACKEND", "rpc")
+TASK_SEARCH_LIMIT = int(os.getenv("TASK_SEARCH_LIMIT", "10"))
+
+
+async def _search_rpc(
+    query: str,
+    group_id: Optional[int],
+    statuses: Optional[Iterable[str]],
+    assigned_to: Optional[str],
+    limit: int,
+) -> List[TaskMatch]:
+    db = await get_db()
+    response = await db.rpc("search_tasks", {
+        "p_query": query,
+        "p_group_id": group_id,
+        "p_statuses": list(statuses) if statuses else None,
+        "p_assigned_to": assigned_to,
+        "p_limit": limit,
+    }).execute()
+
+    # Same scoring convention as the in-memory index: substring hits rank above 1.0.
+    return [
+        TaskMatch(row["task"], (1.0 if row["exact"] else 0.0) + (row["score"] or 0.0), row["exact"])
+        for row in (response.data or [])
+    ]
+
+
+async def _search_memory(
+    query: str,
+    group_id: Optional[int],
+    statuses: Optional[Iterable[str]],
+    assigned_to: Optional[str],
+    limit: int,
+) -> List[TaskMatch]:
+    if group_id:
+        return await search_group_tasks(group_id, query, statuses=statuses, assigned_to=assigned_to, limit=limit)
+
+    # Outside a group the candidate tasks span groups, so fetch and rank them directly.
+    db = await get_db()
+    tasks_query = db.from_("tasks").select("*, projects(name)")
+    if statuses:
+        tasks_query = tasks_query.in_("status", list(statuses))
+    if assigned_to:
+        tasks_query = tasks_query.eq("assigned_to", assigned_to)
+    tasks_res = await tasks_query.execute()
+    return rank_tasks(tasks_res.data or [], query)[:limit]
+
+
+async def search_tasks(
+    query: str,
+    group_id: Optional[int] = None,
+    statuses: Optional[Iterable[str]] = None,
+    assigned_to: Optional[str] = None,
+    limit: int = TASK_SEARCH_LIMIT,
+) -> List[TaskMatch]:
+    """
+    Finds tasks whose title matches `query`, best matches first.
+    Substring matches have exact=True; fuzzy matches are only suggestions.
+    """
+    if TASK_SEARCH_BACKEND == "rpc":
+        try:
+            return await _search_rpc(query, group_id, statuses, assigned_to, limit)
+        except Exception as e:
+            print(f"--- ⚠️ search_tasks RPC failed, falling back to the in-memory index: {e} ---")
+    return await _search_memory(query, group_id, statuses, assigned_to, limit)
@@ -1,10 +1,64 @@
-from utils.supabaseClient import supabase
+from utils.db import get_db
 from utils.auth_helper import get_user_from_telegram, check_admin_permission
-from typing import Tuple, List
-from datetime import datetime
-
-
-def _create_task_service(
+from utils.user_directory import resolve_usernames, resolve_user_ids
+from utils.pagination import decode_cursor, encode_cursor, next_cursor, parse_timestamp
+from services.task_index import TaskMatch, record_task
+from services.task_search import search_tasks
+from services.project_catalog import get_project_by_name
+from typing import Tuple, List, Dict, Any, Optional
+from datetime import datetime, timezone
+import os
+
+TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", "10"))
+BULK_TASK_LIMIT = int(os.getenv("BULK_TASK_LIMIT", "50"))
+
+# Statuses an admin can move tasks to with /set_status, and the status_logs
+# value written for each. "Assigned" needs an assignee, so it goes through /assign_many.
+BULK_STATUS_LOGS = {"Pending": "pending", "In Progress": "working", "Completed": "completed"}
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+
+
+def _did_you_mean(matches: List[TaskMatch]) -> str:
+    """Formats the closest fuzzy matches as a hint for "not found" replies."""
+    suggestions = [m.task["title"] for m in matches if not m.exact][:3]
+    if not suggestions:
+        return ""
+    return "\n\n🔎 Did you mean: " + ", ".join(f"'{title}'" for title in suggestions) + "?"
+
+
+async def _transition_task(
+    task: Dict[str, Any],
+    new_status: str,
+    log_status: str,
+    employee_id: str,
+    group_id: int,
+    notes: str,
+    assigned_to: str = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Moves a task from the status it was read with to `new_status` and writes
+    its status_logs row in one call (see migrations/002_task_status_transition.sql).
+    Returns the updated task, or None if the task changed status in the meantime.
+    """
+    db = await get_db()
+    result = await db.rpc("transition_task_status", {
+        "p_task_id": task["id"],
+        "p_expected_status": task["status"],
+        "p_new_status": new_status,
+        "p_log_status": log_status,
+        "p_employee_id": employee_id,
+        "p_group_id": group_id,
+        "p_notes": notes,
+        "p_assigned_to": assigned_to
+    }).execute()
+
+    if not result.data:
+        return None
+    record_task(result.data[0])
+    return result.data[0]
+
+
+async def _create_task_service(
     telegram_user_id: int, 
     group_id: int,
     title: str, 
@@ -19,20 +73,22 @@ def _create_task_service(
     Returns a tuple: (success, message).
     """
     try:
+        db = await get_db()
         # 1. Permission checks (always run for group tasks)
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, "❌ User not linked. Please use /link first.")
             
-        if not check_admin_permission(user_data["id"], group_id):
+        if not await check_admin_permission(user_data["id"], group_id):
             return (False, "❌ Sorry, only admins can create tasks in groups.")
 
         # 2. Handle the optional project name
         project_id = None
         if project_name:
-            project_res = supabase.from_("projects").select("id").eq("name", project_name).eq("group_id", group_id).execute()
-            if project_res.data:
-                project_id = project_res.data[0]["id"]
+            project = await get_project_by_name(group_id, project_name)
+            if project:
+                project_id = project["id"]
+                project_name = project["name"]
             # Note: If project_name is given but not found, we don't fail.
             # The project_id simply remains None.
 
@@ -47,12 +103,13 @@ def _create_task_service(
             "deadline": deadline
         }
         
-        result = supabase.from_("tasks").insert(task_data).execute()
+        result = await db.from_("tasks").insert(task_data).execute()
 
         if not result.data:
             return (False, "❌ Failed to create task in the database.")
             
         task_id = result.data[0]["id"]
+        record_task({**result.data[0], "projects": {"name": project_name} if project_id else None})
 
         # 4. Format a dynamic success message
         project_text = ""
@@ -69,7 +126,82 @@ def _create_task_service(
         print(f"Error in _create_task_service: {e}")
         return (False, "❗ A server error occurred while creating the task.")
     
-def _assign_task_service(
+async def _create_tasks_service(
+    telegram_user_id: int,
+    group_id: int,
+    tasks: List[Dict[str, Any]]
+) -> Tuple[bool, str]:
+    """
+    - Description: Create several tasks at once (Admin only)
+    - Each item: title (required), description, project_name, deadline (YYYY-MM-DD format)
+    Authorizes once, resolves every project name from the group's catalog and
+    inserts all rows in a single request.
+    Returns a tuple: (success, message).
+    """
+    try:
+        db = await get_db()
+        # 1. Validate the batch
+        tasks = [task for task in tasks if (task.get("title") or "").strip()]
+        if not tasks:
+            return (False, "❌ No tasks to create. Give one task title per line.")
+        if len(tasks) > BULK_TASK_LIMIT:
+            return (False, f"❌ Too many tasks in one message (max {BULK_TASK_LIMIT}).")
+
+        # 2. Permission checks (once for the whole batch)
+        user_data = await get_user_from_telegram(telegram_user_id)
+        if not user_data:
+            return (False, "❌ User not linked. Please use /link first.")
+
+        if not await check_admin_permission(user_data["id"], group_id):
+            return (False, "❌ Sorry, only admins can create tasks in groups.")
+
+        # 3. Resolve every distinct project name (one catalog load at most)
+        projects = {}
+        for name in {task["project_name"] for task in tasks if task.get("project_name")}:
+            projects[name] = await get_project_by_name(group_id, name)
+
+        # 4. Insert all tasks in one request
+        rows = []
+        for task in tasks:
+            project = projects.get(task.get("project_name"))
+            rows.append({
+                "title": task["title"].strip(),
+                "description": task.get("description"),
+                "status": "Pending",
+                "group_id": group_id,
+                "project_id": project["id"] if project else None,
+                "parent_task_id": None,
+                "deadline": task.get("deadline")
+            })
+
+        result = await db.from_("tasks").insert(rows).execute()
+
+        if not result.data:
+            return (False, "❌ Failed to create the tasks in the database.")
+
+        # 5. Format one reply listing every new task
+        project_names = {project["id"]: project["name"] for project in projects.values() if project}
+        message = f"✅ **{len(result.data)} Tasks Created!**\n\n"
+        for created in result.data:
+            project_name = project_names.get(created.get("project_id"))
+            record_task({**created, "projects": {"name": project_name} if project_name else None})
+            project_text = f" 🏷️ {project_name}" if project_name else ""
+            deadline_text = f" 📅 {created['deadline']}" if created.get("deadline") else ""
+            message += f"• {created['title']} — 🆔 `{created['id']}`{project_text}{deadline_text}\n"
+
+        missing = sorted(name for name, project in projects.items() if not project)
+        if missing:
+            missing_text = ", ".join(f"'{name}'" for name in missing)
+            message += f"\n⚠️ **Note:** Project(s) {missing_text} not found, so those tasks are standalone."
+
+        return (True, message)
+
+    except Exception as e:
+        print(f"Error in _create_tasks_service: {e}")
+        return (False, "❗ A server error occurred while creating the tasks.")
+
+
+async def _assign_task_service(
     admin_telegram_user_id: int,
     group_id: int,
     assignee_username: str,
@@ -81,14 +213,15 @@ def _assign_task_service(
     Returns a tuple: (success, message).
     """
     try:
+        db = await get_db()
         # 1. Permission checks (same as before)
-        admin_user_data = get_user_from_telegram(admin_telegram_user_id)
-        if not admin_user_data or not check_admin_permission(admin_user_data["id"], group_id):
+        admin_user_data = await get_user_from_telegram(admin_telegram_user_id)
+        if not admin_user_data or not await check_admin_permission(admin_user_data["id"], group_id):
             return (False, "❌ Sorry, only admins can assign tasks.")
 
         # 2. Find the assignee by their username (same as before)
         clean_username = assignee_username.replace("@", "")
-        assignee_user = supabase.from_("telegram_users").select("id").eq("telegram_username", clean_username).single().execute()
+        assignee_user = await db.from_("telegram_users").select("id").eq("telegram_username", clean_username).single().execute()
         
         if not assignee_user.data:
             return (False, f"❌ User @{clean_username} not found or not linked to the bot.")
@@ -99,45 +232,34 @@ def _assign_task_service(
         task = None
         if task_id:
             # If an ID is provided (from a reply), find the task directly.
-            task_res = supabase.from_("tasks").select("*").eq("id", task_id).eq("group_id", group_id).single().execute()
+            task_res = await db.from_("tasks").select("*").eq("id", task_id).eq("group_id", group_id).single().execute()
             if task_res.data:
                 task = task_res.data
         elif task_name:
-            # If no ID, fall back to searching by name (using our workaround)
-            all_pending_tasks_res = supabase.from_("tasks").select("*").eq("group_id", group_id).eq("status", "Pending").execute()
-            matching_tasks = []
-            if all_pending_tasks_res.data:
-                for t in all_pending_tasks_res.data:
-                    if task_name.lower() in t['title'].lower():
-                        matching_tasks.append(t)
+            # If no ID, fall back to searching by name
+            matches = await search_tasks(task_name, group_id=group_id, statuses=["Pending"])
+            matching_tasks = [m.task for m in matches if m.exact]
             
             if len(matching_tasks) == 1:
                 task = matching_tasks[0]
             elif len(matching_tasks) > 1:
                 return (False, f"❌ Multiple pending tasks found matching '{task_name}'. Please be more specific.")
+            else:
+                return (False, f"❌ No pending task found for the given details.{_did_you_mean(matches)}")
 
         if not task:
             return (False, f"❌ No pending task found for the given details.")
         
-        # 4. Update the task with the assignee and new status
-        update_result = supabase.from_("tasks").update({
-            "assigned_to": assignee_id,
-            "status": "Assigned"
-        }).eq("id", task["id"]).execute()
-
-        if not update_result.data:
-            return (False, "❌ Failed to update the task in the database.")
-
-        # 5. Log the assignment event (same as before)
-        supabase.from_("status_logs").insert({
-            "task_id": task["id"],
-            "employee_id": assignee_id,
-            "status": "assigned",
-            "group_id": group_id,
-            "notes": f"Task assigned to @{clean_username} by admin"
-        }).execute()
+        # 4. Assign the task and log the event in one call
+        updated = await _transition_task(
+            task, "Assigned", "assigned", assignee_id, group_id,
+            f"Task assigned to @{clean_username} by admin",
+            assigned_to=assignee_id
+        )
+        if not updated:
+            return (False, "❌ Failed to update the task. It may have just been changed by someone else.")
 
-        # 6. Return a success message (same as before)
+        # 5. Return a success message (same as before)
         success_message = f"✅ **Task Assigned!**\n📋 **Task:** {task['title']}\n👤 **To:** @{clean_username}"
         return (True, success_message)
 
@@ -145,40 +267,183 @@ def _assign_task_service(
         print(f"Error in _assign_task_service: {e}")
         return (False, "❗ A server error occurred while assigning the task.")
 
-def _working_task_service(
+async def _bulk_assign_service(
+    admin_telegram_user_id: int,
+    group_id: int,
+    assignments: Dict[str, List[str]]
+) -> Tuple[bool, str]:
+    """
+    Assigns several tasks at once. `assignments` maps @usernames to task IDs.
+    Resolves every assignee with one query, updates each assignee's tasks with
+    one filtered update and writes all status_logs rows in one batched insert.
+    Completed tasks are skipped.
+    Returns a tuple: (success, message).
+    """
+    try:
+        db = await get_db()
+        # 1. Permission checks (once for the whole batch)
+        admin_user_data = await get_user_from_telegram(admin_telegram_user_id)
+        if not admin_user_data or not await check_admin_permission(admin_user_data["id"], group_id):
+            return (False, "❌ Sorry, only admins can assign tasks.")
+
+        # 2. Validate the batch
+        assignments = {name.lstrip("@"): list(dict.fromkeys(ids)) for name, ids in assignments.items() if ids}
+        all_ids = [task_id for ids in assignments.values() for task_id in ids]
+        if not all_ids:
+            return (False, "❌ No task IDs given.")
+        if len(all_ids) > BULK_TASK_LIMIT:
+            return (False, f"❌ Too many tasks in one command (max {BULK_TASK_LIMIT}).")
+        if len(set(all_ids)) != len(all_ids):
+            return (False, "❌ A task can only be assigned to one user per command.")
+
+        # 3. Resolve every assignee with one query
+        user_ids = await resolve_user_ids(assignments)
+        missing = [name for name in assignments if name not in user_ids]
+        if missing:
+            return (False, "❌ Not found or not linked to the bot: " + ", ".join(f"@{name}" for name in missing))
+
+        # 4. One filtered update per assignee
+        now = datetime.now(timezone.utc).isoformat()
+        updated_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        logs = []
+        for username, task_ids in assignments.items():
+            assignee_id = user_ids[username]
+            update_result = await (
+                db.from_("tasks")
+                .update({"assigned_to": assignee_id, "status": "Assigned", "updated_at": now})
+                .in_("id", task_ids)
+                .eq("group_id", group_id)
+                .neq("status", "Completed")
+                .execute()
+            )
+            updated_by_user[username] = update_result.data or []
+            for task in updated_by_user[username]:
+                record_task(task)
+                logs.append({
+                    "task_id": task["id"],
+                    "employee_id": assignee_id,
+                    "status": "assigned",
+                    "group_id": group_id,
+                    "notes": f"Task assigned to @{username} by admin"
+                })
+
+        # 5. Log every assignment in one insert
+        if logs:
+            await db.from_("status_logs").insert(logs).execute()
+
+        # 6. Format the summary
+        if not logs:
+            return (False, "❌ None of those tasks could be assigned (not found in this group, or already completed).")
+
+        message = f"✅ **{len(logs)} Task(s) Assigned!**\n"
+        for username, tasks in updated_by_user.items():
+            if tasks:
+                message += f"\n👤 **@{username}**\n"
+                message += "".join(f"   • {task['title']}\n" for task in tasks)
+        skipped = len(all_ids) - len(logs)
+        if skipped:
+            message += f"\n⚠️ {skipped} task(s) skipped (not found in this group, or already completed)."
+        return (True, message)
+
+    except Exception as e:
+        print(f"Error in _bulk_assign_service: {e}")
+        return (False, "❗ A server error occurred while assigning the tasks.")
+
+
+async def _bulk_status_service(
+    admin_telegram_user_id: int,
+    group_id: int,
+    status: str,
+    task_ids: List[str]
+) -> Tuple[bool, str]:
+    """
+    Moves several tasks to `status` at once (Admin only) with one filtered
+    update and one batched status_logs insert.
+    Returns a tuple: (success, message).
+    """
+    try:
+        db = await get_db()
+        # 1. Permission checks (once for the whole batch)
+        admin_user_data = await get_user_from_telegram(admin_telegram_user_id)
+        if not admin_user_data or not await check_admin_permission(admin_user_data["id"], group_id):
+            return (False, "❌ Sorry, only admins can change the status of several tasks.")
+
+        # 2. Validate the status and the batch
+        new_status = next((s for s in BULK_STATUS_LOGS if s.lower() == (status or "").strip().lower()), None)
+        if not new_status:
+            allowed = ", ".join(BULK_STATUS_LOGS)
+            return (False, f"❌ Unknown status '{status}'. Use one of: {allowed}. Use /assign_many to assign tasks.")
+
+        task_ids = list(dict.fromkeys(task_ids))
+        if not task_ids:
+            return (False, "❌ No task IDs given.")
+        if len(task_ids) > BULK_TASK_LIMIT:
+            return (False, f"❌ Too many tasks in one command (max {BULK_TASK_LIMIT}).")
+
+        # 3. Update every task that is not already in that status
+        update_result = await (
+            db.from_("tasks")
+            .update({"status": new_status, "updated_at": datetime.now(timezone.utc).isoformat()})
+            .in_("id", task_ids)
+            .eq("group_id", group_id)
+            .neq("status", new_status)
+            .execute()
+        )
+        updated = update_result.data or []
+        if not updated:
+            return (False, f"❌ None of those tasks could be moved to {new_status} (not found in this group, or already {new_status}).")
+
+        # 4. Log every change in one insert
+        await db.from_("status_logs").insert([
+            {
+                "task_id": task["id"],
+                "employee_id": admin_user_data["id"],
+                "status": BULK_STATUS_LOGS[new_status],
+                "group_id": group_id,
+                "notes": f"Task status changed to {new_status} by admin"
+            }
+            for task in updated
+        ]).execute()
+        for task in updated:
+            record_task(task)
+
+        # 5. Format the summary
+        message = f"✅ **{len(updated)} Task(s) moved to {new_status}!**\n\n"
+        message += "".join(f"   • {task['title']}\n" for task in updated)
+        skipped = len(task_ids) - len(updated)
+        if skipped:
+            message += f"\n⚠️ {skipped} task(s) skipped (not found in this group, or already {new_status})."
+        return (True, message)
+
+    except Exception as e:
+        print(f"Error in _bulk_status_service: {e}")
+        return (False, "❗ A server error occurred while updating the tasks.")
+
+
+async def _working_task_service(
     telegram_user_id: int,
     task_name: str,
     group_id: int = None
 ) -> Tuple[bool, str]:
     """
     Core logic to find a user's assigned task and mark it as "In Progress",
-    using a manual filter to bypass the .ilike() error.
+    matching the name through the task title search.
     """
     try:
         # 1. Get user data
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, "❌ Please link your Telegram account first using /link")
 
-        # 2. WORKAROUND: Fetch all tasks assigned to the user without the ILIKE filter
-        query = supabase.from_("tasks").select("*").eq("assigned_to", user_data["id"]).eq("status", "Assigned")
-        
-        if group_id:
-            query = query.eq("group_id", group_id)
-        
-        all_assigned_tasks_res = query.execute()
-
-        # 3. Filter the results manually in Python
-        matching_tasks = []
-        if all_assigned_tasks_res.data:
-            for task in all_assigned_tasks_res.data:
-                # Case-insensitive check of the title
-                if task_name.lower() in task['title'].lower():
-                    matching_tasks.append(task)
+        # 2. Find the user's assigned tasks whose title matches
+        matches = await search_tasks(task_name, group_id=group_id, statuses=["Assigned"], assigned_to=user_data["id"])
+
+        # 3. Keep the substring matches; fuzzy ones only serve as suggestions
+        matching_tasks = [m.task for m in matches if m.exact]
         
         # 4. Handle the filtered results
         if not matching_tasks:
-            return (False, f"❌ No task '{task_name}' assigned to you was found.")
+            return (False, f"❌ No task '{task_name}' assigned to you was found.{_did_you_mean(matches)}")
 
         if len(matching_tasks) > 1:
             task_list = "\n".join([f"• {task['title']}" for task in matching_tasks[:5]])
@@ -186,22 +451,15 @@ def _working_task_service(
 
         task = matching_tasks[0]
         
-        # 5. Update task status
-        update_result = supabase.from_("tasks").update({"status": "In Progress"}).eq("id", task["id"]).execute()
-
-        if not update_result.data:
-            return (False, "❌ Failed to update task status in the database.")
-            
-        # 6. Log the status change
-        supabase.from_("status_logs").insert({
-            "task_id": task["id"],
-            "employee_id": user_data["id"],
-            "status": "working",
-            "group_id": group_id,
-            "notes": "Task status changed to In Progress"
-        }).execute()
+        # 5. Update task status and log the change in one call
+        updated = await _transition_task(
+            task, "In Progress", "working", user_data["id"], group_id,
+            "Task status changed to In Progress"
+        )
+        if not updated:
+            return (False, "❌ Failed to update task status. It may have just been changed by someone else.")
 
-        # 7. Format and return success message
+        # 6. Format and return success message
         success_message = f"🚀 **Task Started!**\n📋 **Task:** {task['title']}\n📊 **Status:** In Progress"
         return (True, success_message)
 
@@ -210,44 +468,31 @@ def _working_task_service(
         return (False, "❗ An unexpected error occurred.")
     
     
-def _completed_task_service(
+async def _completed_task_service(
     telegram_user_id: int,
     task_name: str,
     group_id: int = None
 ) -> Tuple[bool, str]:
     """
     Core logic to find an "In Progress" task and mark it as "Completed".
-    Uses a manual filter to bypass the .ilike() error.
+    Matches the name through the task title search.
     Returns a tuple: (success, message).
     """
     try:
         # 1. Get user data
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
             return (False, "❌ Please link your Telegram account first using /link")
 
-        # 2. WORKAROUND: Fetch all "In Progress" tasks assigned to the user
-        query = (
-            supabase.from_("tasks")
-            .select("*")
-            .eq("assigned_to", user_data["id"])
-            .eq("status", "In Progress")
-        )
-        if group_id:
-            query = query.eq("group_id", group_id)
-        
-        all_inprogress_tasks_res = query.execute()
+        # 2. Find the user's "In Progress" tasks whose title matches
+        matches = await search_tasks(task_name, group_id=group_id, statuses=["In Progress"], assigned_to=user_data["id"])
 
-        # 3. Filter the results manually in Python
-        matching_tasks = []
-        if all_inprogress_tasks_res.data:
-            for task in all_inprogress_tasks_res.data:
-                if task_name.lower() in task['title'].lower():
-                    matching_tasks.append(task)
+        # 3. Keep the substring matches; fuzzy ones only serve as suggestions
+        matching_tasks = [m.task for m in matches if m.exact]
 
         # 4. Handle filtered results
         if not matching_tasks:
-            return (False, f"✅ No 'In Progress' task named '{task_name}' was found. It might be already completed or not yet started.")
+            return (False, f"✅ No 'In Progress' task named '{task_name}' was found. It might be already completed or not yet started.{_did_you_mean(matches)}")
 
         if len(matching_tasks) > 1:
             task_list = "\n".join([f"• {task['title']}" for task in matching_tasks[:5]])
@@ -265,21 +510,14 @@ def _completed_task_service(
             else:
                 completion_note += " (completed on or before deadline)"
         
-        # 6. Update task status
-        update_result = supabase.from_("tasks").update({"status": "Completed"}).eq("id", task["id"]).execute()
-        if not update_result.data:
-            return (False, "❌ Failed to update task status in the database.")
-
-        # 7. Log the status change
-        supabase.from_("status_logs").insert({
-            "task_id": task["id"],
-            "employee_id": user_data["id"],
-            "status": "completed",
-            "group_id": group_id,
-            "notes": completion_note
-        }).execute()
+        # 6. Update task status and log the change in one call
+        updated = await _transition_task(
+            task, "Completed", "completed", user_data["id"], group_id, completion_note
+        )
+        if not updated:
+            return (False, "❌ Failed to update task status. It may have just been changed by someone else.")
 
-        # 8. Format and return the final success message
+        # 7. Format and return the final success message
         deadline_text = f"📅 **Deadline:** {task['deadline']}" if task.get('deadline') else ""
         success_message = (
             f"✅ **Task Completed!**\n"
@@ -296,46 +534,64 @@ def _completed_task_service(
         return (False, "❗ An unexpected error occurred.")
     
     
-def _list_tasks_service(
+async def _list_tasks_service(
     telegram_user_id: int, 
-    group_id: int = None
-) -> Tuple[bool, str]:
+    group_id: int = None,
+    cursor: str = None
+) -> Tuple[bool, str, Optional[str]]:
     """
-    Core logic to fetch and format a list of tasks for a user.
-    Returns a tuple: (success, message).
+    Core logic to fetch and format one page of a user's tasks, newest first.
+    `cursor` continues after a previous page.
+    Returns a tuple: (success, message, next_cursor); next_cursor is None on the last page.
     """
     try:
+        db = await get_db()
         # 1. Get user data
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
-            return (False, "❌ Please link your Telegram account first using /link")
+            return (False, "❌ Please link your Telegram account first using /link", None)
 
-        # 2. Get tasks assigned to this user from the database
-        query = supabase.from_("tasks").select("*").eq("assigned_to", user_data["id"])
+        # 2. Get one page (plus one row to detect more) of the user's tasks
+        page_cursor = decode_cursor(cursor)
+        query = db.from_("tasks").select("*").eq("assigned_to", user_data["id"])
         if group_id:
             query = query.eq("group_id", group_id)
-        
-        tasks_result = query.order("created_at", desc=True).execute()
+        if page_cursor:
+            query = query.lte("created_at", page_cursor.timestamp)
+
+        offset = page_cursor.skip if page_cursor else 0
+        tasks_result = await (
+            query.order("created_at", desc=True)
+            .order("id", desc=True)
+            .range(offset, offset + TASKS_PAGE_SIZE)
+            .execute()
+        )
+        rows = tasks_result.data or []
+
+        if not rows:
+            if page_cursor:
+                return (True, "📋 No more tasks.", None)
+            return (True, "📋 You have no tasks assigned.", None)
 
-        if not tasks_result.data:
-            return (True, "📋 You have no tasks assigned.")
+        page = rows[:TASKS_PAGE_SIZE]
+        more = encode_cursor(next_cursor(page, "created_at", page_cursor)) if len(rows) > TASKS_PAGE_SIZE else None
 
-        # 3. Group tasks by status
+        # 3. Group the page's tasks by status
         tasks_by_status = {}
-        for task in tasks_result.data:
+        for task in page:
             status = task["status"]
             if status not in tasks_by_status:
                 tasks_by_status[status] = []
             tasks_by_status[status].append(task)
 
         # 4. Build the formatted message (keeping the original format)
-        message = "📋 **Your Tasks:**\n\n"
+        message = "📋 **Your Tasks (continued):**\n\n" if page_cursor else "📋 **Your Tasks:**\n\n"
         status_emojis = {"Pending": "⏳", "Assigned": "📋", "In Progress": "🚀", "Completed": "✅"}
 
         for status, tasks in tasks_by_status.items():
             emoji = status_emojis.get(status, "📌")
             message += f"{emoji} **{status}** ({len(tasks)})\n"
-            for task in tasks[:3]:
+            for task in tasks:
                 deadline = f" (Due: {task['deadline']})" if task.get('deadline') else ""
                 
                 if task.get('deadline') and status != "Completed":
@@ -351,76 +607,103 @@ def _list_tasks_service(
                         deadline += " ⏰" # Due soon
                 
                 message += f"   • {task['title']}{deadline}\n"
-            
-            if len(tasks) > 3:
-                message += f"   ... and {len(tasks) - 3} more\n"
             message += "\n"
 
-        return (True, message)
+        return (True, message, more)
 
     except Exception as e:
         print(f"Error in _list_tasks_service: {e}")
-        return (False, "❗ Something went wrong while fetching tasks.")
+        return (False, "❗ Something went wrong while fetching tasks.", None)
     
     
-def _task_history_service(
+async def _task_history_service(
     telegram_user_id: int,
-    task_name: str,
-    group_id: int = None
-) -> Tuple[bool, str]:
+    task_name: str = None,
+    group_id: int = None,
+    cursor: str = None
+) -> Tuple[bool, str, Optional[str]]:
     """
-    Core logic to find a task and format its history.
+    Core logic to find a task and format one page of its history, oldest first.
     If multiple tasks match, it shows the history for the most recent one.
+    Later pages are requested with the returned cursor ("<task_id>|<page>")
+    instead of the task name; the task must be in `group_id` when given.
+    Returns a tuple: (success, message, next_cursor); next_cursor is None on the last page.
     """
     try:
+        db = await get_db()
         # 1. Get user data (same as before)
-        user_data = get_user_from_telegram(telegram_user_id)
+        user_data = await get_user_from_telegram(telegram_user_id)
         if not user_data:
-            return (False, "❌ Please link your Telegram account first using /link")
-
-        # 2. WORKAROUND: Fetch all tasks and filter in Python (same as before)
-        query = supabase.from_("tasks").select("*")
-        if group_id:
-            query = query.eq("group_id", group_id)
-        all_tasks_res = query.execute()
+            return (False, "❌ Please link your Telegram account first using /link", None)
 
-        matching_tasks = []
-        if all_tasks_res.data:
-            for task in all_tasks_res.data:
-                if task_name.lower() in task['title'].lower():
-                    matching_tasks.append(task)
-        
-        # 3. Handle filtered results
-        if not matching_tasks:
-            return (False, f"❌ Task '{task_name}' not found.")
-        
-        # --- NEW LOGIC TO HANDLE MULTIPLE MATCHES ---
-        task = None
         user_note = ""
-        if len(matching_tasks) > 1:
-            # Sort by creation date (newest first) and pick the top one
-            matching_tasks.sort(key=lambda t: t['created_at'], reverse=True)
-            task = matching_tasks[0]
-            # Create a note to inform the user
-            user_note = f"⚠️ Multiple tasks found. Showing history for the most recent one (ID: `{task['id']}`).\n\n"
+        task_id, _, page_token = (cursor or "").partition("|")
+        if task_id:
+            # 2a. Continuing a previous page: the task is already known
+            task_query = db.from_("tasks").select("id, title").eq("id", task_id)
+            if group_id:
+                task_query = task_query.eq("group_id", group_id)
+            task_res = await task_query.execute()
+            if not task_res.data:
+                return (False, "❌ That task no longer exists.", None)
+            task = task_res.data[0]
         else:
-            task = matching_tasks[0]
-        # --- END OF NEW LOGIC ---
+            # 2b. Search task titles (scoped to the group when there is one)
+            matches = await search_tasks(task_name, group_id=group_id)
 
-        # 4. Get task history logs (same as before)
-        logs_result = supabase.from_("status_logs").select("*").eq("task_id", task["id"]).order("timestamp", desc=False).execute()
+            matching_tasks = [m.task for m in matches if m.exact]
+            
+            # 3. Handle filtered results
+            if not matching_tasks:
+                return (False, f"❌ Task '{task_name}' not found.{_did_you_mean(matches)}", None)
+            
+            # --- NEW LOGIC TO HANDLE MULTIPLE MATCHES ---
+            task = None
+            if len(matching_tasks) > 1:
+                # Sort by creation date (newest first) and pick the top one
+                matching_tasks.sort(key=lambda t: t['created_at'], reverse=True)
+                task = matching_tasks[0]
+                # Create a note to inform the user
+                user_note = f"⚠️ Multiple tasks found. Showing history for the most recent one (ID: `{task['id']}`).\n\n"
+            else:
+                task = matching_tasks[0]
+            # --- END OF NEW LOGIC ---
+
+        # 4. Get one page (plus one row to detect more) of the task's history
+        page_cursor = decode_cursor(page_token)
+        logs_query = db.from_("status_logs").select("*").eq("task_id", task["id"])
+        if page_cursor:
+            logs_query = logs_query.gte("timestamp", page_cursor.timestamp)
+
+        offset = page_cursor.skip if page_cursor else 0
+        logs_result = await (
+            logs_query.order("timestamp", desc=False)
+            .order("id", desc=False)
+            .range(offset, offset + HISTORY_PAGE_SIZE)
+            .execute()
+        )
+        rows = logs_result.data or []
+
+        if not rows:
+            if page_cursor:
+                return (True, f"✔️ No more history for task '{task['title']}'.", None)
+            return (True, f"✔️ No history found for task '{task['title']}'.", None)
 
-        if not logs_result.data:
-            return (True, f"✔️ No history found for task '{task['title']}'.")
+        page = rows[:HISTORY_PAGE_SIZE]
+        more = None
+        if len(rows) > HISTORY_PAGE_SIZE:
+            # The task ID without dashes keeps the "More" button's callback_data within 64 bytes.
+            more = f"{task['id'].replace('-', '')}|{encode_cursor(next_cursor(page, 'timestamp', page_cursor))}"
 
         # 5. Build the formatted history message (with the new note)
-        message = user_note + f"📋 **Task History: {task['title']}**\n\n"
+        title_suffix = " (continued)" if page_cursor else ""
+        message = user_note + f"📋 **Task History: {task['title']}**{title_suffix}\n\n"
         status_emojis = {"created": "🆕", "assigned": "👤", "working": "🚀", "completed": "✅"}
 
-        for log in logs_result.data:
+        for log in page:
             timestamp = log.get("timestamp")
             if timestamp:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                dt = parse_timestamp(timestamp)
                 time_str = dt.strftime('%Y-%m-%d %H:%M')
             else:
                 time_str = "Unknown time"
@@ -433,14 +716,14 @@ def _task_history_service(
                 message += f"   > {log['notes']}\n"
             message += "\n"
 
-        return (True, message)
+        return (True, message, more)
 
     except Exception as e:
         print(f"Error in _task_history_service: {e}")
-        return (False, "❗ Something went wrong while fetching task history.")
+        return (False, "❗ Something went wrong while fetching task history.", None)
     
     
-def _task_details_service(
+async def _task_details_service(
     task_name: str,
     group_id: int
 ) -> Tuple[bool, List[str]]:
@@ -448,40 +731,26 @@ def _task_details_service(
     Core logic to find tasks and format their details, using correct queries.
     """
     try:
-        # 1. WORKAROUND: Fetch tasks and join projects (which has a valid FK)
-        # We remove the incorrect telegram_users join from this query.
-        all_tasks_res = (
-            supabase.from_("tasks")
-            .select("*, projects(name)") 
-            .eq("group_id", group_id)
-            .in_("status", ["Assigned", "Pending"])
-            .execute()
-        )
-
-        matching_tasks = []
-        if all_tasks_res.data:
-            for task in all_tasks_res.data:
-                if task_name.lower() in task['title'].lower():
-                    matching_tasks.append(task)
+        # 1. Search task titles (rows carry the joined project name)
+        matches = await search_tasks(task_name, group_id=group_id, statuses=["Assigned", "Pending"])
+        matching_tasks = [m.task for m in matches if m.exact]
 
         if not matching_tasks:
-            return (True, ["❌ No matching tasks found with that name and status 'Assigned' or 'Pending'."])
+            return (True, [f"❌ No matching tasks found with that name and status 'Assigned' or 'Pending'.{_did_you_mean(matches)}"])
+
+        # 2. Resolve every assignee's username with one query
+        usernames = await resolve_usernames(task.get("assigned_to") for task in matching_tasks)
 
-        # 2. Build a formatted message for each matching task
+        # 3. Build a formatted message for each matching task
         messages = []
         for task in matching_tasks:
             project_name = task.get("projects", {}).get("name") if task.get("projects") else "None"
             deadline = task.get("deadline") or "Not set"
             assignee_username = "Unassigned"
 
-            # 3. Manually fetch the assignee's username if an ID exists
             assignee_id = task.get("assigned_to")
-            if assignee_id:
-                # This second query gets the username using the ID from the task
-                # Assuming your 'telegram_users' table has an 'id' column that is a FK to 'auth.users.id'
-                user_res = supabase.from_("telegram_users").select("telegram_username").eq("id", assignee_id).single().execute()
-                if user_res.data:
-                    assignee_username = f"@{user_res.data['telegram_username']}"
+            if assignee_id and usernames.get(assignee_id):
+                assignee_username = f"@{usernames[assignee_id]}"
 
             # 4. Format the final message
             message = (
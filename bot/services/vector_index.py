@@ -0,0 +1,335 @@
+# bot/services/vector_index.py
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from utils.cache import TTLCache
+from services import embedding_codec
+from services.keyword_index import BM25Index, reciprocal_rank_fusion, term_counts
+
+# Local, file-backed chunk index used when RAG_BACKEND=local (no server-side
+# vector search). Each project has a directory under RAG_INDEX_DIR with:
+#   vectors.bin  - embedding_codec header, then one L2-normalized row per chunk
+#   chunks.jsonl - one JSON line per chunk (content, file_id, chunk_index,
+#                  and its keyword term counts for BM25)
+#   offsets.i64  - byte offset of each line in chunks.jsonl
+#   meta.json    - {"dim", "count", "version", "dtype"}, rewritten atomically last
+# Rows past meta["count"] (an interrupted append) are ignored by readers.
+# Removing a file's chunks rewrites the directory as a whole and swaps it in;
+# indexes already open keep reading the files they opened.
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "rag_index"))
+RAG_INDEX_CACHE_SIZE = int(os.getenv("RAG_INDEX_CACHE_SIZE", "32"))
+RAG_INDEX_CACHE_TTL = int(os.getenv("RAG_INDEX_CACHE_TTL", "3600"))
+# Row format of new indexes: float32, float16 (half the size, no measurable
+# recall loss) or int8 (a quarter, per-vector scale). Compact rows are
+# upcast block by block at query time, which makes a search several times
+# slower than over float32 rows (benchmarks/embedding_recall.py), so they
+# only pay off when index size matters more than latency. Existing indexes
+# keep the format recorded in their meta.json.
+RAG_INDEX_DTYPE = os.getenv("RAG_INDEX_DTYPE", "float32")
+
+_write_locks: Dict[str, threading.Lock] = {}
+_write_locks_guard = threading.Lock()
+
+
+class ChunkHit(NamedTuple):
+    row: int
+    score: float
+
+
+def _project_dir(project_id: str) -> str:
+    return os.path.join(RAG_INDEX_DIR, str(project_id))
+
+
+def _read_meta(project_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(project_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"dim": 0, "count": 0, "version": 0, "dtype": RAG_INDEX_DTYPE}
+
+
+def _write_meta(project_dir: str, meta: Dict[str, Any]) -> None:
+    tmp_path = os.path.join(project_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(project_dir, "meta.json"))
+
+
+def _write_lock(project_id: str) -> threading.Lock:
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(project_id), threading.Lock())
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Returns a contiguous float32 copy of `matrix` with unit-length rows."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int, dtype: str = "float32") -> List[ChunkHit]:
+    """
+    Best k rows of an L2-normalized matrix (stored as embedding_codec rows of
+    `dtype`) by cosine similarity to `query`: one matrix-vector product and
+    an O(n) argpartition, then a sort of only k items.
+    """
+    if matrix.shape[0] == 0 or k <= 0:
+        return []
+    scores = embedding_codec.scores(matrix, dtype, normalize_rows(query.reshape(1, -1))[0])
+    k = min(k, scores.shape[0])
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return [ChunkHit(int(i), float(scores[i])) for i in best]
+
+
+class LocalVectorIndex:
+    """
+    One project's index at one content version, with its vectors memory-mapped
+    and its chunks file held open. Readers bracket their use with
+    `acquire()`/`release()`; `close()` (called when the index leaves the
+    cache) releases the files once the last reader is done.
+    """
+
+    def __init__(self, project_dir: str, meta: Dict[str, Any]):
+        self.project_dir = project_dir
+        self.version = meta["version"]
+        self.count = meta["count"]
+        self.dtype = meta["dtype"]
+        if self.count:
+            self.vectors = np.memmap(
+                os.path.join(project_dir, "vectors.bin"), dtype=embedding_codec.row_dtype(self.dtype, meta["dim"]),
+                mode="r", offset=embedding_codec.HEADER.size, shape=(self.count,),
+            )
+            self.offsets = np.memmap(os.path.join(project_dir, "offsets.i64"), dtype=np.int64, mode="r", shape=(self.count,))
+            self._chunks = open(os.path.join(project_dir, "chunks.jsonl"), "rb")
+        else:
+            self.vectors = np.zeros((0,), dtype=embedding_codec.row_dtype(self.dtype, meta["dim"] or 1))
+            self.offsets = np.zeros((0,), dtype=np.int64)
+            self._chunks = None
+        self._chunks_lock = threading.Lock()
+        self._users = 0
+        self._closing = False
+        self._keywords: Optional[BM25Index] = None
+        self._keywords_lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Registers a reader. False once the index is closing; open it again instead."""
+        with self._chunks_lock:
+            if self._closing:
+                return False
+            self._users += 1
+            return True
+
+    def release(self) -> None:
+        with self._chunks_lock:
+            self._users -= 1
+            if self._closing and not self._users:
+                self._close_files()
+
+    def close(self) -> None:
+        with self._chunks_lock:
+            self._closing = True
+            if not self._users:
+                self._close_files()
+
+    def _close_files(self) -> None:
+        if self._chunks is not None:
+            self._chunks.close()
+            self._chunks = None
+        # Dropping the memmaps unmaps the files once no view is left.
+        self.vectors = self.offsets = None
+        self._keywords = None
+
+    def chunk(self, row: int) -> Dict[str, Any]:
+        with self._chunks_lock:
+            self._chunks.seek(int(self.offsets[row]))
+            chunk = json.loads(self._chunks.readline())
+        chunk.pop("terms", None)
+        return chunk
+
+    def lines(self) -> List[bytes]:
+        """The raw chunks.jsonl lines of all rows, in row order."""
+        if not self.count:
+            return []
+        with self._chunks_lock:
+            self._chunks.seek(0)
+            return [self._chunks.readline() for _ in range(self.count)]
+
+    def keywords(self) -> BM25Index:
+        """The BM25 index over the term counts stored with each chunk, built on first use."""
+        with self._keywords_lock:
+            if self._keywords is None:
+                self._keywords = BM25Index(json.loads(line).get("terms", {}) for line in self.lines())
+            return self._keywords
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        query_text: Optional[str] = None,
+        candidates: int = 20,
+        rrf_k: int = 60,
+    ) -> List[Dict[str, Any]]:
+        """
+        The k chunks most similar to `query`. With `query_text`, the best
+        `candidates` by cosine similarity and by BM25 are fused by reciprocal rank.
+        """
+        if not query_text:
+            return [
+                {**self.chunk(hit.row), "similarity": hit.score}
+                for hit in top_k(self.vectors, query, k, self.dtype)
+            ]
+
+        dense = top_k(self.vectors, query, max(k, candidates), self.dtype)
+        sparse = self.keywords().search(query_text, max(k, candidates))
+        similarity = {hit.row: hit.score for hit in dense}
+        fused = reciprocal_rank_fusion([[hit.row for hit in dense], [row for row, _ in sparse]], rrf_k)
+        return [
+            {**self.chunk(row), "similarity": similarity.get(row), "score": score}
+            for row, score in fused[:k]
+        ]
+
+
+_indexes = TTLCache(
+    maxsize=RAG_INDEX_CACHE_SIZE, ttl=RAG_INDEX_CACHE_TTL, on_evict=LocalVectorIndex.close,
+)  # (project_id, version) -> LocalVectorIndex
+
+
+def open_index(project_id: str) -> LocalVectorIndex:
+    """The project's index at its current version, from the LRU cache when possible."""
+    project_dir = _project_dir(project_id)
+    meta = _read_meta(project_dir)
+    key = (str(project_id), meta["version"])
+    index = _indexes.get(key)
+    if index is None:
+        started = time.monotonic()
+        index = LocalVectorIndex(project_dir, meta)
+        _indexes.observe_load(time.monotonic() - started)
+        _indexes.set(key, index)
+    return index
+
+
+def search(project_id: str, query: np.ndarray, k: int, **kwargs) -> List[Dict[str, Any]]:
+    """LocalVectorIndex.search on the project's current index, kept open while it runs."""
+    index = open_index(project_id)
+    if not index.acquire():
+        # Evicted since the lookup: search a private copy, closed when done.
+        project_dir = _project_dir(project_id)
+        index = LocalVectorIndex(project_dir, _read_meta(project_dir))
+        index.acquire()
+        index.close()
+    try:
+        return index.search(query, k, **kwargs)
+    finally:
+        index.release()
+
+
+def append_chunks(project_id: str, chunks: List[Dict[str, Any]], embeddings: np.ndarray) -> int:
+    """Appends chunks and their embeddings to the project's index and bumps its version."""
+    vectors = normalize_rows(embeddings)
+    dim = vectors.shape[1]
+    project_dir = _project_dir(project_id)
+    with _write_lock(project_id):
+        os.makedirs(project_dir, exist_ok=True)
+        meta = _read_meta(project_dir)
+        if meta["count"] and meta["dim"] != dim:
+            raise ValueError(f"embedding size {dim} does not match the index ({meta['dim']})")
+        dtype = meta["dtype"] if meta["count"] else RAG_INDEX_DTYPE
+        rows = embedding_codec.quantize(vectors, dtype)
+
+        # Cut off anything left by an interrupted append before writing new rows.
+        vectors_path = os.path.join(project_dir, "vectors.bin")
+        offsets_path = os.path.join(project_dir, "offsets.i64")
+        chunks_path = os.path.join(project_dir, "chunks.jsonl")
+        chunks_size = 0
+        if meta["count"]:
+            last = np.memmap(offsets_path, dtype=np.int64, mode="r", shape=(meta["count"],))[-1]
+            with open(chunks_path, "rb") as f:
+                f.seek(int(last))
+                f.readline()
+                chunks_size = f.tell()
+        for path, size in (
+            (vectors_path, embedding_codec.HEADER.size + meta["count"] * embedding_codec.row_dtype(dtype, dim).itemsize),
+            (offsets_path, meta["count"] * 8),
+            (chunks_path, chunks_size),
+        ):
+            with open(path, "ab") as f:
+                f.truncate(size)
+
+        offsets = []
+        with open(chunks_path, "ab") as f:
+            for chunk in chunks:
+                offsets.append(f.tell())
+                line = {**chunk, "terms": term_counts(chunk["content"])}
+                f.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+        with open(vectors_path, "r+b") as f:
+            f.write(embedding_codec.header(dtype, dim))
+            f.seek(0, os.SEEK_END)
+            f.write(rows.tobytes())
+        with open(offsets_path, "ab") as f:
+            f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+
+        _write_meta(project_dir, {"dim": int(dim), "count": meta["count"] + len(chunks), "version": meta["version"] + 1, "dtype": dtype})
+    return len(chunks)
+
+
+def remove_file(project_id: str, file_id: str) -> int:
+    """
+    Removes one file's chunks from the project's index, e.g. before the file
+    is indexed again. The remaining rows are written to a new directory that
+    replaces the old one. Returns the number of chunks removed.
+    """
+    project_dir = _project_dir(project_id)
+    with _write_lock(project_id):
+        meta = _read_meta(project_dir)
+        if not meta["count"]:
+            return 0
+        index = LocalVectorIndex(project_dir, meta)
+        lines = index.lines()
+        vectors = index.vectors
+        index.close()
+        keep = [row for row, line in enumerate(lines) if json.loads(line).get("file_id") != str(file_id)]
+        removed = meta["count"] - len(keep)
+        if not removed:
+            return 0
+
+        new_dir = project_dir + ".new"
+        old_dir = project_dir + ".old"
+        shutil.rmtree(new_dir, ignore_errors=True)
+        os.makedirs(new_dir)
+        offsets = []
+        with open(os.path.join(new_dir, "chunks.jsonl"), "wb") as f:
+            for row in keep:
+                offsets.append(f.tell())
+                f.write(lines[row])
+        with open(os.path.join(new_dir, "vectors.bin"), "wb") as f:
+            f.write(embedding_codec.header(meta["dtype"], meta["dim"]))
+            f.write(np.ascontiguousarray(vectors[keep]).tobytes())
+        with open(os.path.join(new_dir, "offsets.i64"), "wb") as f:
+            f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+        _write_meta(new_dir, {**meta, "count": len(keep), "version": meta["version"] + 1})
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(project_dir, old_dir)
+        os.replace(new_dir, project_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    _indexes.invalidate_where(lambda key: key[0] == str(project_id))
+    return removed
+
+
+def drop_index(project_id: str) -> None:
+    """Deletes a project's index files and forgets its cached versions."""
+    with _write_lock(project_id):
+        shutil.rmtree(_project_dir(project_id), ignore_errors=True)
+    _indexes.invalidate_where(lambda key: key[0] == str(project_id))
+
+
+def vector_index_stats() -> Dict[str, Any]:
+    return _indexes.stats()
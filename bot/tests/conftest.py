@@ -0,0 +1,6 @@
+# bot/tests/conftest.py
+import os
+import sys
+
+# The bot's modules import each other from the bot directory (as main.py runs).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
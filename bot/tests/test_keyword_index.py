@@ -0,0 +1,35 @@
+# bot/tests/test_keyword_index.py
+from services.keyword_index import BM25Index, term_counts, tokenize
+
+CHUNKS = [
+    "Release v2.3 ships on 2024-05-01 after the freeze.",
+    "Release v2.4 ships on 2024-06-01.",
+    "Version 2 of the billing service was released in 2023.",
+    "JIRA-1234 tracks the login crash on 05-01 builds.",
+]
+
+
+def _search(query, k=4):
+    index = BM25Index(term_counts(chunk) for chunk in CHUNKS)
+    return [row for row, _ in index.search(query, k)]
+
+
+def test_hyphenated_and_dotted_tokens_keep_their_parts():
+    assert tokenize("Ships 2024-05-01, v2.3") == ["ships", "2024-05-01", "2024", "05", "01", "v2.3", "v2", "3"]
+    assert tokenize("jira-1234") == ["jira-1234", "jira", "1234"]
+
+
+def test_whole_identifiers_rank_their_chunk_first():
+    assert _search("what ships on 2024-05-01?")[0] == 0
+    assert _search("v2.3 release")[0] == 0
+    assert _search("v2.4")[0] == 1
+    assert _search("JIRA-1234")[0] == 3
+
+
+def test_parts_of_identifiers_match():
+    assert set(_search("2024")) == {0, 1}
+    assert _search("1234") == [3]
+
+
+def test_stopwords_alone_match_nothing():
+    assert _search("what is the") == []
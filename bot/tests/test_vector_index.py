@@ -0,0 +1,63 @@
+# bot/tests/test_vector_index.py
+import numpy as np
+import pytest
+
+from services import vector_index
+
+CONTENTS = ["Release checklist for the mobile app", "Billing service runbook", "Q3 roadmap notes"]
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "RAG_INDEX_DIR", str(tmp_path))
+    vector_index._indexes.invalidate_where(lambda key: True)
+
+
+def _chunks(file_id):
+    return [{"content": content, "file_id": file_id, "chunk_index": i, "char_start": 0} for i, content in enumerate(CONTENTS)]
+
+
+def _embeddings():
+    return np.random.default_rng(0).standard_normal((len(CONTENTS), 8)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_reupload_replaces_earlier_chunks(monkeypatch, dtype):
+    monkeypatch.setattr(vector_index, "RAG_INDEX_DTYPE", dtype)
+    vector_index.append_chunks("p1", _chunks("old-file"), _embeddings())
+    vector_index.append_chunks("p1", [{"content": "Unrelated notes", "file_id": "other-file", "chunk_index": 0}], _embeddings()[:1] * -1)
+    stale = vector_index.open_index("p1")
+    assert stale.acquire()
+
+    assert vector_index.remove_file("p1", "old-file") == len(CONTENTS)
+    vector_index.append_chunks("p1", _chunks("new-file"), _embeddings())
+
+    assert vector_index.open_index("p1").count == len(CONTENTS) + 1
+    results = vector_index.search("p1", _embeddings()[0], k=10, query_text="release checklist")
+    assert {chunk["file_id"] for chunk in results} == {"new-file", "other-file"}
+    assert [chunk["content"] for chunk in results if chunk["file_id"] == "new-file"].count(CONTENTS[0]) == 1
+    assert results[0]["content"] == CONTENTS[0]
+    # A search that started before the removal still reads its own rows;
+    # the evicted index closes its files once it is released.
+    assert stale.chunk(0)["file_id"] == "old-file"
+    stale.release()
+    assert stale._chunks is None
+    assert not stale.acquire()
+
+
+def test_evicted_index_is_closed_and_searches_reopen():
+    vector_index.append_chunks("p1", _chunks("old-file"), _embeddings())
+    index = vector_index.open_index("p1")
+    vector_index._indexes.invalidate_where(lambda key: True)
+
+    assert index._chunks is None
+    assert vector_index.search("p1", _embeddings()[1], k=1)[0]["content"] == CONTENTS[1]
+
+
+def test_remove_unknown_file_keeps_index():
+    vector_index.append_chunks("p1", _chunks("old-file"), _embeddings())
+    version = vector_index.open_index("p1").version
+
+    assert vector_index.remove_file("p1", "missing") == 0
+    assert vector_index.remove_file("p2", "old-file") == 0
+    assert vector_index.open_index("p1").version == version
@@ -1,75 +1,127 @@
 # utils/auth_helper.py
-from .supabaseClient import supabase
+from .db import get_db
+from .cache import TTLCache
 from typing import Optional, Dict, Any
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
-def get_user_from_telegram(telegram_id: int) -> Optional[Dict[str, Any]]:
+# Identity and permission lookups run before every command, so they are cached.
+# /link and group registration invalidate the affected entries explicitly.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "5000"))
+
+_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)   # telegram_id -> user row (or None)
+_admin_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)  # (user_id, group_id) -> bool
+_NOT_CACHED = object()
+
+async def get_user_from_telegram(telegram_id: int) -> Optional[Dict[str, Any]]:
     """
     Retrieve user information from Supabase using Telegram ID.
-    
+    Results (including "not linked") are cached until /link invalidates them.
+
     Args:
         telegram_id (int): The Telegram user ID
-        
+
     Returns:
         Optional[Dict[str, Any]]: User data if found, None otherwise
     """
+    cached = _user_cache.get(telegram_id, _NOT_CACHED)
+    if cached is not _NOT_CACHED:
+        return cached
+
     try:
+        db = await get_db()
+        started = time.monotonic()
         # Query the telegram_users table for the telegram_id
-        response = supabase.table('telegram_users').select('*').eq('telegram_id', telegram_id).execute()
-        
+        response = await db.table('telegram_users').select('*').eq('telegram_id', telegram_id).execute()
+        _user_cache.observe_load(time.monotonic() - started)
+
         if response.data and len(response.data) > 0:
             user = response.data[0]
             logger.info(f"User found for telegram_id {telegram_id}: {user.get('telegram_username', 'N/A')}")
+            _user_cache.set(telegram_id, user)
             return user
         else:
             logger.warning(f"No user found for telegram_id {telegram_id}")
+            _user_cache.set(telegram_id, None)
             return None
-            
+
     except Exception as e:
         logger.error(f"Error retrieving user for telegram_id {telegram_id}: {str(e)}")
         return None
 
-def check_admin_permission(user_id: str, group_id: int) -> bool:
+async def check_admin_permission(user_id: str, group_id: int) -> bool:
     """
     Check if a user has admin permissions for a specific group.
     Checks both:
     1. Global admin/developer role in roles table
     2. Group-specific admin in groups table
-    
+
     Args:
         user_id (str): The user ID from the users table
         group_id (int): The Telegram group ID
-        
+
     Returns:
         bool: True if user is admin or developer, False otherwise
     """
+    cached = _admin_cache.get((user_id, group_id))
+    if cached is not None:
+        return cached
+
     try:
+        db = await get_db()
+        started = time.monotonic()
+        is_admin = False
+
         # Check if user has global admin or developer role in roles table
-        response = supabase.table('roles').select('role').eq('user_id', user_id).execute()
-        
+        response = await db.table('roles').select('role').eq('user_id', user_id).execute()
+
         if response.data and len(response.data) > 0:
             roles = [role_data.get('role') for role_data in response.data]
             is_global_admin = 'admin' in roles or 'developer' in roles
-            
+
             if is_global_admin:
                 logger.info(f"Global admin access granted for user_id {user_id} with roles: {roles}")
-                return True
-        
+                is_admin = True
+
         # Check if user is admin of the specific group
-        group_response = supabase.table('groups').select('admin_id').eq('group_id', group_id).execute()
-        
-        if group_response.data and len(group_response.data) > 0:
-            group_admin_id = group_response.data[0].get('admin_id')
-            
-            if group_admin_id == user_id:
-                logger.info(f"Group admin access granted for user_id {user_id} in group {group_id}")
-                return True
-        
-        logger.info(f"Admin access denied for user_id {user_id} in group {group_id}")
-        return False
-            
+        if not is_admin:
+            group_response = await db.table('groups').select('admin_id').eq('group_id', group_id).execute()
+
+            if group_response.data and len(group_response.data) > 0:
+                group_admin_id = group_response.data[0].get('admin_id')
+
+                if group_admin_id == user_id:
+                    logger.info(f"Group admin access granted for user_id {user_id} in group {group_id}")
+                    is_admin = True
+
+        if not is_admin:
+            logger.info(f"Admin access denied for user_id {user_id} in group {group_id}")
+
+        _admin_cache.observe_load(time.monotonic() - started)
+        _admin_cache.set((user_id, group_id), is_admin)
+        return is_admin
+
     except Exception as e:
         logger.error(f"Error checking admin permission for user_id {user_id} in group {group_id}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+def invalidate_user(telegram_id: int, user_id: Optional[str] = None) -> None:
+    """
+    Drops cached identity data for a Telegram account, and every cached
+    permission of the linked user if `user_id` is given.
+    """
+    _user_cache.invalidate(telegram_id)
+    if user_id:
+        _admin_cache.invalidate_where(lambda key: key[0] == user_id)
+
+def invalidate_group(group_id: int) -> None:
+    """Drops every cached permission decision for a group."""
+    _admin_cache.invalidate_where(lambda key: key[1] == group_id)
+
+def auth_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the identity and permission caches."""
+    return {"users": _user_cache.stats(), "admin": _admin_cache.stats()}
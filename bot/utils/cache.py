@@ -0,0 +1,110 @@
+# utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    A small size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Counts hits and misses, and the time spent loading values on a miss
+    (reported by callers through `observe_load`), so the latency saved by
+    the cache can be estimated from `stats()`. `on_evict`, if given, is
+    called with every value that leaves the cache (evicted, expired,
+    replaced or invalidated), outside the cache's lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Optional[Callable[[Any], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load_time = 0.0
+        self._loads = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` if it is missing or expired."""
+        dropped = []
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                dropped.append(value)
+            self.misses += 1
+        self._evicted(dropped)
+        return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get(), but without touching the hit/miss counters or LRU order."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Stores `value` under `key`, evicting the least recently used entry if full."""
+        dropped = []
+        with self._lock:
+            previous = self._data.get(key)
+            if previous is not None and previous[1] is not value:
+                dropped.append(previous[1])
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                dropped.append(self._data.popitem(last=False)[1][1])
+        self._evicted(dropped)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        self._evicted([entry[1]] if entry is not None else [])
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drops every entry whose key matches `predicate`. Returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            dropped = [self._data.pop(key)[1] for key in stale]
+        self._evicted(dropped)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            dropped = [value for _, value in self._data.values()]
+            self._data.clear()
+        self._evicted(dropped)
+
+    def _evicted(self, values: List[Any]) -> None:
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
+
+    def observe_load(self, seconds: float) -> None:
+        """Records how long a miss took to load from the source of truth."""
+        with self._lock:
+            self._load_time += seconds
+            self._loads += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        avg_load_ms = 1000 * self._load_time / self._loads if self._loads else 0.0
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "avg_load_ms": round(avg_load_ms, 2),
+            "est_saved_ms": round(self.hits * avg_load_ms, 2),
+        }
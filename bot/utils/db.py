@@ -0,0 +1,81 @@
+# utils/db.py
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
+
+from .supabaseClient import SUPABASE_URL, SUPABASE_ROLE_KEY
+
+# Timeouts (seconds) for PostgREST and Storage requests made through the shared client.
+DB_TIMEOUT = int(os.getenv("DB_TIMEOUT", "30"))
+
+_client: Optional[AsyncClient] = None
+_client_lock = asyncio.Lock()
+
+
+async def get_db() -> AsyncClient:
+    """
+    Returns the shared async Supabase client, creating it on first use.
+
+    The client keeps one long-lived HTTP session per sub-client (PostgREST,
+    Storage), so every service awaits its queries over the same pool of
+    keep-alive connections instead of blocking the event loop.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    async with _client_lock:
+        if _client is None:
+            _client = await acreate_client(
+                SUPABASE_URL,
+                SUPABASE_ROLE_KEY,
+                options=AsyncClientOptions(
+                    postgrest_client_timeout=DB_TIMEOUT,
+                    storage_client_timeout=DB_TIMEOUT,
+                ),
+            )
+            print("--- 🔌 Async Supabase client created ---")
+    return _client
+
+
+def _http_closers(client: AsyncClient) -> List[Tuple[str, Callable[[], Awaitable[None]]]]:
+    """
+    The aclose() of every HTTP session the client has opened. PostgREST,
+    Storage and Functions are created on first use, so only the ones that
+    exist are read (their properties would create them).
+    """
+    closers = []
+    postgrest = getattr(client, "_postgrest", None)
+    if postgrest is not None:
+        closers.append(("postgrest", postgrest.aclose))
+    storage = getattr(client, "_storage", None)
+    if storage is not None:
+        closers.append(("storage", storage.session.aclose))
+    functions = getattr(client, "_functions", None)
+    if functions is not None:
+        closers.append(("functions", functions._client.aclose))
+    closers.append(("auth", client.auth.close))
+    return closers
+
+
+async def close_db(*_) -> None:
+    """
+    Closes the pooled HTTP sessions of the shared client (PostgREST,
+    Storage, Functions and Auth).
+    Registered as the Application's post_shutdown hook in main.py.
+    """
+    global _client
+    if _client is None:
+        return
+
+    try:
+        for name, aclose in _http_closers(_client):
+            try:
+                await aclose()
+            except Exception as e:
+                print(f"Error closing Supabase {name} session: {e}")
+    finally:
+        _client = None
+        print("--- 🔌 Async Supabase client closed ---")
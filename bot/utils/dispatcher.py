@@ -0,0 +1,102 @@
+# utils/dispatcher.py
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+DISPATCHER_QUEUE_SIZE = int(os.getenv("DISPATCHER_QUEUE_SIZE", "100"))
+DISPATCHER_QUEUE_TIMEOUT = float(os.getenv("DISPATCHER_QUEUE_TIMEOUT", "10"))
+
+
+class DispatcherBusyError(Exception):
+    """Raised when a call could not be queued before the queue timeout expired."""
+
+
+class GroupDispatcher:
+    """
+    Runs service calls (coroutine functions, which spend their time awaiting
+    the database) while keeping calls that share a key (a Telegram chat) in
+    submission order.
+
+    - Calls for the same key run one at a time, in the order they arrived.
+      Calls for different keys run concurrently on the event loop; a slow
+      call only holds up its own chat.
+    - At most `max_queue` calls may be waiting or running. Further callers wait
+      up to `queue_timeout` seconds for room, then get DispatcherBusyError.
+    """
+
+    def __init__(self, max_queue: int, queue_timeout: float):
+        self._admission = asyncio.Semaphore(max_queue)
+        self._queue_timeout = queue_timeout
+        self._max_queue = max_queue
+
+        # Per-key FIFO locks and the number of calls holding/waiting on each.
+        self._key_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._key_depth: Dict[Hashable, int] = {}
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Queues `await func(*args, **kwargs)` behind earlier calls for `key` and returns its result."""
+        submitted_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise DispatcherBusyError(f"Dispatcher queue is full ({self._max_queue} calls pending).")
+
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        self._key_depth[key] = self._key_depth.get(key, 0) + 1
+        self._queued += 1
+        started = False
+        try:
+            async with lock:
+                waited = time.monotonic() - submitted_at
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                self._queued -= 1
+                self._running += 1
+                started = True
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._running -= 1
+                    self._completed += 1
+        finally:
+            if not started:
+                # Cancelled while still waiting for its turn.
+                self._queued -= 1
+            self._key_depth[key] -= 1
+            if self._key_depth[key] == 0:
+                del self._key_depth[key]
+                self._key_locks.pop(key, None)
+            self._admission.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of queue depth and wait times."""
+        # Called from the health-check server's thread while the event loop
+        # updates the dict: copy it in one step before iterating.
+        depths = list(dict(self._key_depth).values())
+        return {
+            "max_queue": self._max_queue,
+            "queued": self._queued,
+            "running": self._running,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(1000 * self._total_wait / self._completed, 2) if self._completed else 0.0,
+            "max_wait_ms": round(1000 * self._max_wait, 2),
+            # Depths only: /stats is public, so no chat IDs.
+            "active_chats": len(depths),
+            "busiest_chat_depth": max(depths, default=0),
+        }
+
+
+dispatcher = GroupDispatcher(
+    max_queue=DISPATCHER_QUEUE_SIZE,
+    queue_timeout=DISPATCHER_QUEUE_TIMEOUT,
+)
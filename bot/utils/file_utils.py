@@ -1,42 +1,125 @@
 import os
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
 import PyPDF2
 import docx
 
-def _read_from_txt(file_path: str) -> str:
-    """Reads content from a plain text file."""
+# Plain-text files are streamed in blocks of this many characters.
+TEXT_BLOCK_SIZE = 64 * 1024
+# PDF and DOCX text is extracted by a pool of PDF_EXTRACT_WORKERS processes,
+# so parsing never holds the bot's GIL. PDFs with at least
+# PDF_PARALLEL_MIN_PAGES pages are split into jobs of PDF_PAGE_RANGE pages;
+# smaller ones are one job, as re-opening the file per range costs more than
+# it saves. 0 workers extracts in the calling thread.
+# Each worker is a full interpreter that imports the bot's modules, so the
+# default stays small whatever the machine's core count.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_PAGE_RANGE = int(os.getenv("PDF_PAGE_RANGE", "16"))
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            print(f"--- 📄 Started {PDF_EXTRACT_WORKERS} text extraction process(es) ---")
+        return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _read_from_txt(file_path: str) -> Iterator[str]:
+    """Yields the content of a plain text file in blocks."""
     try:
         with open(file_path, "r", encoding='utf-8') as f:
-            return f.read()
+            while True:
+                block = f.read(TEXT_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
     except Exception as e:
         print(f"Error reading TXT file {file_path}: {e}")
-        return ""
 
-def _read_from_pdf(file_path: str) -> str:
-    """Extracts text content from a PDF file."""
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) of a PDF; runs in the extraction pool."""
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _read_pdf_parallel(file_path: str, page_count: int) -> Iterator[str]:
+    """
+    Yields a PDF's pages in order while page ranges are extracted in the
+    pool. At most two ranges per worker are in flight, so a large file
+    neither waits for its last page nor piles up text in memory.
+    """
+    pool = _get_pdf_pool()
+    ranges = iter(range(0, page_count, PDF_PAGE_RANGE))
+    in_flight = deque()
+    try:
+        for start in ranges:
+            in_flight.append(pool.submit(_extract_pdf_pages, file_path, start, min(start + PDF_PAGE_RANGE, page_count)))
+            if len(in_flight) >= 2 * PDF_EXTRACT_WORKERS:
+                break
+        while in_flight:
+            pages = in_flight.popleft().result()
+            start = next(ranges, None)
+            if start is not None:
+                in_flight.append(pool.submit(_extract_pdf_pages, file_path, start, min(start + PDF_PAGE_RANGE, page_count)))
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def _read_from_pdf(file_path: str) -> Iterator[str]:
+    """Yields the text content of a PDF file one page at a time."""
     try:
-        text = ""
         with open(file_path, "rb") as f:
             reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        return text
+            page_count = len(reader.pages)
+            if PDF_EXTRACT_WORKERS < 1:
+                for page in reader.pages:
+                    yield page.extract_text() or ""
+                return
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            yield from _get_pdf_pool().submit(_extract_pdf_pages, file_path, 0, page_count).result()
+        else:
+            yield from _read_pdf_parallel(file_path, page_count)
     except Exception as e:
         print(f"Error reading PDF file {file_path}: {e}")
-        return ""
 
-def _read_from_docx(file_path: str) -> str:
-    """Extracts text content from a DOCX file."""
+def _extract_docx_paragraphs(file_path: str) -> List[str]:
+    """Text of each paragraph of a DOCX file; runs in the extraction pool."""
+    return [para.text for para in docx.Document(file_path).paragraphs]
+
+def _read_from_docx(file_path: str) -> Iterator[str]:
+    """Yields the text content of a DOCX file one paragraph at a time."""
     try:
-        doc = docx.Document(file_path)
-        return "\n".join([para.text for para in doc.paragraphs])
+        if PDF_EXTRACT_WORKERS < 1:
+            paragraphs = _extract_docx_paragraphs(file_path)
+        else:
+            paragraphs = _get_pdf_pool().submit(_extract_docx_paragraphs, file_path).result()
+        for i, text in enumerate(paragraphs):
+            yield ("\n" if i else "") + text
     except Exception as e:
         print(f"Error reading DOCX file {file_path}: {e}")
-        return ""
 
-def read_text_from_file(file_path: str) -> str:
+def iter_text_from_file(file_path: str) -> Iterator[str]:
     """
-    Reads text content from a file based on its extension.
-    Supports .txt, .pdf, and .docx files.
+    Yields the text content of a file in pieces (pages, paragraphs or blocks),
+    based on its extension, so large files never have to be held in memory.
+    Supports .txt, .md, .pdf, and .docx files.
     """
     _, file_extension = os.path.splitext(file_path)
     file_extension = file_extension.lower()
@@ -44,12 +127,11 @@ def read_text_from_file(file_path: str) -> str:
     print(f"--- 📄 Reading file: {file_path} (type: {file_extension}) ---")
 
     if file_extension == ".txt" or file_extension == ".md":
-        return _read_from_txt(file_path)
+        yield from _read_from_txt(file_path)
     elif file_extension == ".pdf":
-        return _read_from_pdf(file_path)
+        yield from _read_from_pdf(file_path)
     elif file_extension == ".docx":
-        return _read_from_docx(file_path)
+        yield from _read_from_docx(file_path)
     else:
         print(f"--- ⚠️ Unsupported file type: {file_extension} ---")
-        return ""
 
@@ -0,0 +1,49 @@
+# utils/pagination.py
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Pages are fetched by keyset on a timestamp column. A cursor is the timestamp
+# of the last row shown plus how many rows with exactly that timestamp have
+# already been shown, so ties never repeat or drop rows. It is encoded as
+# "<epoch_microseconds>.<skip>" to fit Telegram's 64-byte callback_data.
+
+_FRACTION = re.compile(r"\.(\d+)")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Cursor(NamedTuple):
+    timestamp: str  # ISO-8601, UTC
+    skip: int
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parses a PostgREST timestamp, whatever the number of fractional digits."""
+    value = value.replace("Z", "+00:00")
+    value = _FRACTION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), value, count=1)
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    micros = (parse_timestamp(cursor.timestamp) - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{cursor.skip}"
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    if not token:
+        return None
+    micros, _, skip = token.partition(".")
+    dt = _EPOCH + timedelta(microseconds=int(micros))
+    return Cursor(dt.isoformat(), int(skip or 0))
+
+
+def next_cursor(rows: List[Dict[str, Any]], field: str, cursor: Optional[Cursor]) -> Cursor:
+    """The cursor that continues after the last of `rows` (a non-empty page)."""
+    last = rows[-1][field]
+    last_dt = parse_timestamp(last)
+    skip = sum(1 for row in rows if parse_timestamp(row[field]) == last_dt)
+    if cursor and parse_timestamp(cursor.timestamp) == last_dt:
+        # The whole page shared the cursor's timestamp; keep counting from there.
+        skip += cursor.skip
+    return Cursor(last, skip)
@@ -1,4 +1,3 @@
-from supabase import create_client, Client
 from dotenv import load_dotenv
 import os
 
@@ -11,7 +10,5 @@ SUPABASE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 if not SUPABASE_URL or not SUPABASE_ROLE_KEY:
     raise Exception("❌ .env values not loaded properly!")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ROLE_KEY)
-
 print("✅ Supabase URL:", SUPABASE_URL)
 print("✅ Supabase Key:", SUPABASE_ROLE_KEY[:8] + "...")
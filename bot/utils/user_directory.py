@@ -0,0 +1,80 @@
+# utils/user_directory.py
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import TTLCache
+from .db import get_db
+
+# user_id -> telegram_username, shared by every service that renders @mentions.
+USER_DIRECTORY_TTL = int(os.getenv("USER_DIRECTORY_TTL", "600"))
+USER_DIRECTORY_SIZE = int(os.getenv("USER_DIRECTORY_SIZE", "10000"))
+
+_usernames = TTLCache(maxsize=USER_DIRECTORY_SIZE, ttl=USER_DIRECTORY_TTL)
+_NOT_CACHED = object()
+
+
+async def resolve_usernames(user_ids: Iterable[Optional[str]]) -> Dict[str, Optional[str]]:
+    """
+    Resolves a set of user IDs to their Telegram usernames.
+    Cached IDs are served from memory; the rest are fetched with a single
+    `in_` query. Unknown IDs map to None.
+    """
+    result: Dict[str, Optional[str]] = {}
+    missing = []
+    for user_id in {uid for uid in user_ids if uid}:
+        cached = _usernames.get(user_id, _NOT_CACHED)
+        if cached is _NOT_CACHED:
+            missing.append(user_id)
+        else:
+            result[user_id] = cached
+
+    if missing:
+        db = await get_db()
+        started = time.monotonic()
+        response = await db.from_("telegram_users").select("id, telegram_username").in_("id", missing).execute()
+        _usernames.observe_load(time.monotonic() - started)
+
+        found = {row["id"]: row.get("telegram_username") for row in (response.data or [])}
+        for user_id in missing:
+            username = found.get(user_id)
+            _usernames.set(user_id, username)
+            result[user_id] = username
+
+    return result
+
+
+async def resolve_user_ids(usernames: Iterable[str]) -> Dict[str, str]:
+    """
+    Resolves Telegram usernames (with or without "@") to user IDs with a
+    single `in_` query. Usernames that are not linked are left out.
+    The usernames found are also cached for the ID -> username direction.
+    """
+    wanted: List[str] = sorted({name.lstrip("@") for name in usernames if name and name.lstrip("@")})
+    if not wanted:
+        return {}
+
+    db = await get_db()
+    response = await db.from_("telegram_users").select("id, telegram_username").in_("telegram_username", wanted).execute()
+
+    result: Dict[str, str] = {}
+    for row in response.data or []:
+        result[row["telegram_username"]] = row["id"]
+        _usernames.set(row["id"], row["telegram_username"])
+    return result
+
+
+async def get_username(user_id: Optional[str]) -> Optional[str]:
+    """Convenience wrapper around resolve_usernames for a single ID."""
+    if not user_id:
+        return None
+    return (await resolve_usernames([user_id])).get(user_id)
+
+
+def invalidate_username(user_id: str) -> None:
+    """Drops a cached username, e.g. after /link updates telegram_users."""
+    _usernames.invalidate(user_id)
+
+
+def user_directory_stats() -> Dict[str, Any]:
+    return _usernames.stats()